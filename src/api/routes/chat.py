@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from core.utils.file_discovery import discover_files
-from core.llm import generate_answer
-from .dependency import get_processor, get_retriever
-from config.constants import UPLOAD_DIR
+import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from core.llm import ANSWER_ERROR_PREFIX, generate_answer, stream_answer
+from core.llm_client import LLMError
+from config.constants import DEFAULT_NUMBER_OF_CHUNKS
+from .dependency import ensure_index_ready, get_answer_cache, get_context_builder
 from pydantic import BaseModel
-from pathlib import Path
 
 
 class ChatRequest(BaseModel):
@@ -14,25 +16,92 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     answer: str
+    cached: bool = False
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
+async def retrieve_context(req: ChatRequest):
+    ensure_index_ready()
+    chunks = await asyncio.to_thread(
+        get_context_builder().build, req.query, DEFAULT_NUMBER_OF_CHUNKS
+    )
+    if not chunks:
+        raise HTTPException(status_code=404, detail="No relevant context found.")
+    return chunks
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat(req: ChatRequest):
     print(f"incoming req: {req}")
-    upload_path = Path(UPLOAD_DIR)
-    files = discover_files(upload_path)
-    if not files:
-        raise HTTPException(
-            status_code=404, detail="No files found to retrieve context."
-        )
+    chunks = await retrieve_context(req)
 
-    await get_processor().process_files(files)
-    chunks = get_retriever().retrieve(req.query, top_k=5)
-    if not chunks:
-        raise HTTPException(status_code=404, detail="No relevant context found.")
+    cache = get_answer_cache()
+    cached = await asyncio.to_thread(cache.lookup, req.query, req.language, chunks)
+    if cached is not None:
+        return ChatResponse(answer=cached, cached=True)
 
-    answer = generate_answer(req.query, chunks, req.language)
+    answer = await generate_answer(req.query, chunks, req.language)
+    if not answer.startswith(ANSWER_ERROR_PREFIX):
+        await asyncio.to_thread(cache.store, req.query, req.language, chunks, answer)
     return ChatResponse(answer=answer)
+
+
+@router.post("/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Server-sent events: one `sources` event with the retrieved chunks, then a
+    `token` event per generated token and a final `done` (or `error`) event.
+    """
+    print(f"incoming stream req: {req}")
+    chunks = await retrieve_context(req)
+    cache = get_answer_cache()
+    cached = await asyncio.to_thread(cache.lookup, req.query, req.language, chunks)
+
+    async def events():
+        yield sse_event(
+            "sources",
+            [
+                {
+                    k: c[k]
+                    for k in ("id", "file_id", "file_ext", "page", "text", "score")
+                }
+                for c in chunks
+            ],
+        )
+        if cached is not None:
+            yield sse_event("token", {"token": cached})
+            yield sse_event("done", {"cached": True})
+            return
+
+        tokens = stream_answer(req.query, chunks, req.language)
+        answer = []
+        try:
+            async for token in tokens:
+                if await request.is_disconnected():
+                    # closing the stream drops the Ollama connection, which
+                    # stops the generation instead of letting it run to the end
+                    print("Client disconnected, cancelling generation.")
+                    return
+                answer.append(token)
+                yield sse_event("token", {"token": token})
+            yield sse_event("done", {"cached": False})
+            if "".join(answer).strip():
+                await asyncio.to_thread(
+                    cache.store, req.query, req.language, chunks, "".join(answer)
+                )
+        except LLMError as e:
+            yield sse_event("error", {"detail": f"{ANSWER_ERROR_PREFIX}: {e}"})
+        finally:
+            await tokens.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,44 +1,63 @@
+from fastapi import HTTPException
+from core.resources import resources
 from core.async_processor import FileProcessor
+from core.ingestion import IngestionWorker
+from core.answer_cache import AnswerCache
 from core.embeddings import EmbeddingManager
 from core.retriever import Retriever
+from core.context import ContextBuilder
 from core.user.manager import UserManager
 from core.quiz.store import QuizStore
 from core.quiz.engine import QuizEngine
 from core.quiz.generator import QuizGenerator
-from core.quiz.evaluator import Evaluator
-
-processor = FileProcessor()
-embedder = EmbeddingManager()
-retriever = Retriever(embedder)
-user_manager = UserManager()
-store = QuizStore()
-engine = QuizEngine(store, Evaluator(store), user_manager)
-generator = QuizGenerator(retriever, store)
 
 
 def get_processor() -> FileProcessor:
-    return processor
+    return resources.get("processor")
+
+
+def get_ingestion_worker() -> IngestionWorker:
+    return resources.get("ingestion_worker")
 
 
 def get_embedder() -> EmbeddingManager:
-    return embedder
+    return resources.get("embedder")
 
 
 def get_retriever() -> Retriever:
-    return retriever
+    return resources.get("retriever")
+
+
+def get_context_builder() -> ContextBuilder:
+    return resources.get("context_builder")
+
+
+def get_answer_cache() -> AnswerCache:
+    return resources.get("answer_cache")
 
 
 def get_user_manager() -> UserManager:
-    return user_manager
+    return resources.get("user_manager")
 
 
 def get_quiz_store() -> QuizStore:
-    return store
+    return resources.get("quiz_store")
 
 
 def get_quiz_engine() -> QuizEngine:
-    return engine
+    return resources.get("quiz_engine")
 
 
 def get_quiz_generator() -> QuizGenerator:
-    return generator
+    return resources.get("quiz_generator")
+
+
+def ensure_index_ready():
+    if get_embedder().count() > 0:
+        return
+    if get_ingestion_worker().is_busy():
+        raise HTTPException(
+            status_code=503,
+            detail="Documents are still being indexed, try again shortly.",
+        )
+    raise HTTPException(status_code=404, detail="No documents found.")
@@ -0,0 +1,54 @@
+from pathlib import Path
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from fastapi import APIRouter, HTTPException
+from config.constants import UPLOAD_DIR
+from .dependency import get_ingestion_worker
+
+
+class IngestRequest(BaseModel):
+    files: Optional[List[str]] = None
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    status: str
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    files: Dict[str, Dict[str, Any]]
+
+
+router = APIRouter(prefix="/ingest", tags=["Ingest"])
+
+
+@router.post("/", response_model=IngestJobResponse, status_code=202)
+def submit_ingest(req: IngestRequest):
+    files = None
+    if req.files is not None:
+        upload_dir = Path(UPLOAD_DIR)
+        files = [upload_dir / Path(name).name for name in req.files]
+        missing = [f.name for f in files if not f.is_file()]
+        if missing:
+            raise HTTPException(
+                status_code=404, detail=f"Files not found: {', '.join(missing)}"
+            )
+
+    job = get_ingestion_worker().submit(files)
+    return IngestJobResponse(**job.to_dict())
+
+
+@router.get("/", response_model=List[IngestJobResponse])
+def list_ingest_jobs():
+    return [
+        IngestJobResponse(**job.to_dict()) for job in get_ingestion_worker().list_jobs()
+    ]
+
+
+@router.get("/{job_id}", response_model=IngestJobResponse)
+def get_ingest_job(job_id: str):
+    job = get_ingestion_worker().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return IngestJobResponse(**job.to_dict())
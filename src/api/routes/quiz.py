@@ -1,10 +1,19 @@
-from pathlib import Path
 from pydantic import BaseModel
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, Query
-from core.utils.file_discovery import discover_files
-from config.constants import UPLOAD_DIR
-from .dependency import get_processor, get_quiz_generator, get_quiz_engine
+from core.quiz.engine import (
+    AlreadySubmitted,
+    InvalidSubmission,
+    QuizNotFound,
+    SessionConflict,
+    SessionNotFound,
+)
+from .dependency import (
+    ensure_index_ready,
+    get_quiz_generator,
+    get_quiz_engine,
+    get_quiz_store,
+)
 
 
 class QuizCreateRequest(BaseModel):
@@ -24,11 +33,17 @@ class QuizQuestionResponse(BaseModel):
     options: Optional[List[str]] = None
 
 
+class QuizStartResponse(QuizQuestionResponse):
+    session_id: str
+
+
 class QuizAnswerRequest(BaseModel):
-    quiz_id: str
+    session_id: str
     question_id: str
-    user_id: str
     user_answer: str
+    # optional, checked against the session when given
+    quiz_id: Optional[str] = None
+    user_id: Optional[str] = None
 
 
 class QuizAnswerResponse(BaseModel):
@@ -39,17 +54,34 @@ class QuizAnswerResponse(BaseModel):
     summary: Optional[dict] = None
 
 
+class QuizSubmitAnswer(BaseModel):
+    question_id: str
+    user_answer: str
+
+
+class QuizSubmitRequest(BaseModel):
+    user_id: str
+    answers: List[QuizSubmitAnswer]
+
+
+class QuizGradedAnswer(BaseModel):
+    question_id: str
+    correct: bool
+    feedback: str
+    score: float
+
+
+class QuizSubmitResponse(BaseModel):
+    results: List[QuizGradedAnswer]
+    summary: dict
+
+
 router = APIRouter(prefix="/quiz", tags=["Quiz"])
 
 
 @router.post("/create", response_model=QuizCreateResponse)
 async def create_quiz(req: QuizCreateRequest):
-    upload_dir = Path(UPLOAD_DIR)
-    files = discover_files(upload_dir)
-    if not files:
-        raise HTTPException(status_code=404, detail="No documents found.")
-
-    await get_processor().process_files(files)
+    ensure_index_ready()
     quiz_id = await get_quiz_generator().generate_general(
         num_questions=req.num_questions,
         response_language=req.language,
@@ -58,17 +90,36 @@ async def create_quiz(req: QuizCreateRequest):
     return QuizCreateResponse(quiz_id=quiz_id, total_questions=req.num_questions)
 
 
-@router.get("/{quiz_id}/start", response_model=QuizQuestionResponse)
+@router.get("/{quiz_id}/questions", response_model=List[QuizQuestionResponse])
+def get_quiz_questions(quiz_id: str):
+    questions = get_quiz_store().get_quiz_questions(quiz_id)
+    if not questions:
+        raise HTTPException(status_code=404, detail="No questions found.")
+    return questions
+
+
+@router.get("/{quiz_id}/start", response_model=QuizStartResponse)
 def start_quiz(quiz_id: str, user_id: str = Query(...)):
     q = get_quiz_engine().start(user_id, quiz_id)
     if not q:
         raise HTTPException(status_code=404, detail="No questions found.")
-    return QuizQuestionResponse(**q)
+    return QuizStartResponse(**q)
 
 
 @router.post("/answer", response_model=QuizAnswerResponse)
-def answer_quiz(req: QuizAnswerRequest):
-    result = get_quiz_engine().answer(req.question_id, req.user_answer)
+async def answer_quiz(req: QuizAnswerRequest):
+    try:
+        result = await get_quiz_engine().answer(
+            req.session_id,
+            req.question_id,
+            req.user_answer,
+            user_id=req.user_id,
+            quiz_id=req.quiz_id,
+        )
+    except SessionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SessionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     next_q = result.get("next")
     return QuizAnswerResponse(
         correct=result["correct"],
@@ -77,3 +128,20 @@ def answer_quiz(req: QuizAnswerRequest):
         next_question=next_q,
         summary=result.get("summary"),
     )
+
+
+@router.post("/{quiz_id}/submit", response_model=QuizSubmitResponse)
+async def submit_quiz(quiz_id: str, req: QuizSubmitRequest):
+    try:
+        result = await get_quiz_engine().submit(
+            req.user_id,
+            quiz_id,
+            [(a.question_id, a.user_answer) for a in req.answers],
+        )
+    except QuizNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidSubmission as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except AlreadySubmitted as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return QuizSubmitResponse(**result)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from .dependency import (
+    get_answer_cache,
+    get_embedder,
+    get_quiz_engine,
+    get_quiz_generator,
+)
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/")
+def get_stats():
+    return {
+        "embedding_cache": get_embedder().cache.stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "grading": get_quiz_engine().evaluator.stats(),
+        "question_bank": get_quiz_generator().bank.stats(),
+    }
@@ -1,28 +1,17 @@
 import sys
 import asyncio
 from pathlib import Path
-from core.retriever import Retriever
-from core.async_processor import FileProcessor
 from core.llm import generate_answer
+from core.resources import resources
 from core.utils.file_discovery import discover_files
-from core.embeddings import EmbeddingManager
-from core.quiz.store import QuizStore
-from core.quiz.engine import QuizEngine
-from core.quiz.evaluator import Evaluator
-from core.quiz.generator import QuizGenerator
-from core.user.manager import UserManager
+from core.utils.watcher import UploadWatcher
 from config.constants import (
     UPLOAD_DIR,
     DEFAULT_RESPONSE_LANGUAGE,
+    DEFAULT_NUMBER_OF_CHUNKS,
     QUIZ_QUESTIONS_NUMBER,
 )
 
-# Singletones
-processor = FileProcessor()
-embedder = EmbeddingManager()
-retriever = Retriever(embedder)
-user_manager = UserManager()
-
 
 async def demo_explaination(
     upload_dir: str = UPLOAD_DIR, response_language: str = DEFAULT_RESPONSE_LANGUAGE
@@ -38,10 +27,12 @@ async def demo_explaination(
     for f in files_to_process:
         print(" -", f.name)
 
-    await processor.process_files(files_to_process)
+    await resources.get("processor").process_files(files_to_process)
 
     query = "Explain the difference between AMF and SMF."
-    context_chunks = retriever.retrieve(query, top_k=5)
+    context_chunks = resources.get("context_builder").build(
+        query, top_k=DEFAULT_NUMBER_OF_CHUNKS
+    )
 
     print("\nRetrieved context chunks:")
     for i, chunk in enumerate(context_chunks):
@@ -51,13 +42,14 @@ async def demo_explaination(
 
     print("User's query: ", query)
 
-    answer = generate_answer(query, context_chunks, response_language)
+    answer = await generate_answer(query, context_chunks, response_language)
     print("\n[LLM Answer]:\n", answer)
 
 
 async def demo_quiz(
     upload_dir: str = UPLOAD_DIR, response_language: str = DEFAULT_RESPONSE_LANGUAGE
 ):
+    user_manager = resources.get("user_manager")
     user_name = input("Enter your name: ").strip() or "default_user"
     user_id = user_manager.get_or_create_user(user_name)
     print(f"Welcome, {user_name} (user_id={user_id})")
@@ -72,13 +64,10 @@ async def demo_quiz(
     for f in files_to_process:
         print(" -", f.name)
 
-    await processor.process_files(files_to_process)
+    await resources.get("processor").process_files(files_to_process)
 
-    store = QuizStore()
-    engine = QuizEngine(store, Evaluator(store), user_manager)
-    generator = QuizGenerator(retriever, store)
-
-    quiz_id = await generator.generate_general(
+    engine = resources.get("quiz_engine")
+    quiz_id = await resources.get("quiz_generator").generate_general(
         num_questions=QUIZ_QUESTIONS_NUMBER,
         response_language=response_language,
     )
@@ -90,9 +79,9 @@ async def demo_quiz(
             for i, opt in enumerate(q["options"]):
                 print(f"  {chr(97+i)}) {opt}")
         ans = input("Your answer: ")
-        result = engine.answer(q["id"], ans)
+        result = await engine.answer(q["session_id"], q["id"], ans)
         print(result["feedback"])
-        q = result.get("next")
+        q = result.get("next") and {"session_id": q["session_id"], **result["next"]}
         if not q:
             print("\nQuiz complete!")
             print(result["summary"])
@@ -108,6 +97,23 @@ async def demo_quiz(
     print(f"user's summary: {user_summary}")
 
 
+async def watch_uploads(upload_dir: str = UPLOAD_DIR):
+    processor = resources.get("processor")
+
+    async def on_changes(changed, deleted):
+        if deleted:
+            await processor.remove_files(deleted)
+        if changed:
+            results = await processor.process_files(changed)
+            for file_id, r in results.items():
+                print(f" - {file_id}: {r['status']} ({r['chunks']} chunks)")
+
+    watcher = UploadWatcher(
+        Path(upload_dir), on_changes, known_files=processor.registry.known_files()
+    )
+    await watcher.run()
+
+
 if __name__ == "__main__":
 
     if len(sys.argv) < 2:
@@ -120,6 +126,11 @@ if __name__ == "__main__":
         asyncio.run(demo_explaination())
     elif arg == "quiz":
         asyncio.run(demo_quiz())
+    elif arg == "watch":
+        try:
+            asyncio.run(watch_uploads())
+        except KeyboardInterrupt:
+            print("Stopped watching.")
     else:
         print("no relevant mode, opting for expl")
         asyncio.run(demo_explaination())
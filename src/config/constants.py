@@ -1,23 +1,124 @@
+import os
+
 UPLOAD_DIR = "./data/uploads"
 SQL3_PATH = "./data/registry.db"
+
+# SQLite (shared per-thread connections, WAL)
+DB_BUSY_TIMEOUT = 5.0  # seconds a writer waits for the lock
+DB_CACHE_SIZE_KB = 16 * 1024
+DB_MMAP_SIZE = 128 * 1024 * 1024
+DB_CACHED_STATEMENTS = 256
+
 DEFAULT_RESPONSE_LANGUAGE = "English"
 
-OLLAMA_API_URL = "http://localhost:11434/api"
+OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api")
 LLM_MODEL = "mistral"
 
+# LLM client
+LLM_TIMEOUT = 120.0
+LLM_CONNECT_TIMEOUT = 5.0
+LLM_RETRIES = 2
+LLM_RETRY_BACKOFF = 0.5
+LLM_POOL_SIZE = 10
+LLM_MAX_CONCURRENCY_PER_MODEL = 2
+
 CHROMA_DB_SAVINGS = "./data/embeddings"
 SENTENCE_TRANSFORMER_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
 CHROMA_COLLECTION_NAME = "documents"
 
+# Embedding backend: "sentence-transformers" (fp32 PyTorch) or "onnx-int8"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_MAX_SEQ_LENGTH = 128
+ONNX_MODEL_DIR = "./data/onnx"
+ONNX_THREADS = 0  # 0 = ONNX Runtime default (all physical cores)
+WARM_UP_ON_STARTUP = True  # load models in the background once the API is up
+
+# Embedding scheduler: texts per model call and how long a batch may wait to fill
+EMBED_MAX_BATCH = 64
+EMBED_MAX_WAIT = 0.01
+EMBED_QUERY_MAX_WAIT = 0.002
+
+# Embedding cache (in-memory LRU in front of a SQLite table)
+EMBEDDING_CACHE_PATH = "./data/embedding_cache.db"
+EMBEDDING_CACHE_SIZE = 50000
+
 # File processor
 MAX_CONCURENT_FILES = 5
 BATCH_SIZE = 16 
+HASH_BLOCK_SIZE = 1024 * 1024
+INGEST_QUEUE_SIZE = 4  # chunk batches buffered between extraction and embedding
+
+# Chunking (in tokens of the embedding model's tokenizer)
+CHUNK_MAX_TOKENS = 126  # max_seq_length 128 minus [CLS] and [SEP]
+CHUNK_OVERLAP_TOKENS = 16
+
+# Audio transcription
+WHISPER_MODEL_SIZE = "base"  # "tiny", "small", etc.
+WHISPER_WORKERS = 2  # 1 = one shared in-process model, >1 = process pool
+WHISPER_SEGMENT_SECONDS = 120
+
+# PDF extraction and OCR
+PDF_WORKERS = os.cpu_count() or 1
+PDF_PAGES_PER_TASK = 16  # smaller PDFs are read in-process
+PDF_OCR_DPI = 300
+OCR_LANGUAGES = "eng+slk"
+OCR_WORKERS = os.cpu_count() or 1
+OCR_MAX_WIDTH = 2000  # wider images are downscaled before OCR
+OCR_TILE_HEIGHT = 2000  # taller images are cut into strips
+OCR_CACHE_PATH = "./data/ocr_cache.db"
+
+# Background ingestion
+INGEST_JOB_HISTORY = 100
+
+# Upload dir watcher
+WATCH_UPLOADS = True
+WATCH_POLL_INTERVAL = 5.0
+WATCH_DEBOUNCE = 0.5
+
+# Retrieval: "dense", "lexical" or "hybrid" (reciprocal-rank fusion of both)
+RETRIEVAL_MODE = "hybrid"
+HYBRID_CANDIDATES_FACTOR = 4
+RRF_K = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+LEXICAL_BOOTSTRAP_BATCH = 5000
+
+# Re-ranking and prompt packing (budgets are in cross-encoder tokens)
+RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+RERANK_BATCH_SIZE = 32
+RERANK_OVERFETCH = 4
+CONTEXT_TOKEN_BUDGET = 1200
+QUIZ_CONTEXT_TOKEN_BUDGET = 2500
+DUPLICATE_CHUNK_SIMILARITY = 0.8
 
 # Explanation
 DEFAULT_NUMBER_OF_CHUNKS = 3
 
+# Answer cache for repeated / near-duplicate chat questions
+ANSWER_CACHE_SIZE = 1000
+ANSWER_CACHE_TTL = 6 * 60 * 60
+ANSWER_CACHE_SIMILARITY = 0.95
+
 # Testing
 NUMBER_OF_QUIZ_CHUNKS = 10
 QUIZ_QUESTIONS_NUMBER = 2
+QUIZ_SESSION_TTL = 2 * 60 * 60  # seconds an idle session stays in memory
+QUIZ_SESSION_CACHE_SIZE = 10000
+QUIZ_GRADING_CONCURRENCY = 4  # open-ended grading prompts in flight per submission
+QUIZ_GRADING_BATCH_SIZE = 4  # open-ended answers per grading prompt, 1 disables
+# open answers are graded locally when both the embedding cosine to the
+# reference and the share of reference words they contain agree, and by
+# the LLM otherwise
+GRADING_ACCEPT_SIMILARITY = 0.9
+GRADING_ACCEPT_OVERLAP = 0.6
+GRADING_REJECT_SIMILARITY = 0.3
+GRADING_REJECT_OVERLAP = 0.1
+
+# Question bank, generated per chunk in the background after ingestion
+QUESTION_BANK_LANGUAGES = [DEFAULT_RESPONSE_LANGUAGE]  # filled right after ingestion
+QUESTION_BANK_QUESTIONS_PER_CHUNK = 2
+QUESTION_BANK_LOW_WATERMARK = 50  # unused questions per language before a refill
+QUESTION_BANK_REFILL_CHUNKS = 10  # chunks generated from per refill
+QUESTION_BANK_SAMPLE_POOL = 10  # candidates read per requested question
 
 CORRECTNESS_TRESHOLD = 6
@@ -0,0 +1,147 @@
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+from core.embeddings import EmbeddingManager, PRIORITY_QUERY
+from core.retriever import normalize_query
+from config.constants import (
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_SIMILARITY,
+)
+
+ContextKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Entry:
+    def __init__(self, key: ContextKey, vector: np.ndarray, answer: str, files):
+        self.key = key
+        self.vector = vector
+        self.answer = answer
+        self.files: Set[str] = set(files)
+        self.created_at = time.time()
+
+
+class AnswerCache:
+    """
+    Caches generated answers for near-duplicate questions. An entry matches
+    when the response language and the retrieved chunks (ids + content hashes)
+    are identical and the normalized query embeddings are close enough.
+    Entries expire after `ttl` seconds, are evicted LRU beyond `max_items`
+    and are dropped as soon as one of their source files is re-ingested.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingManager,
+        max_items: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        threshold: float = ANSWER_CACHE_SIMILARITY,
+    ):
+        self.embedder = embedder
+        self.max_items = max_items
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_key: Dict[ContextKey, Set[int]] = {}
+        self._by_file: Dict[str, Set[int]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _context_key(self, language: str, chunks: List[Dict[str, Any]]) -> ContextKey:
+        signature = tuple(sorted((c["id"], c.get("hash") or "") for c in chunks))
+        return (language.strip().lower(), signature)
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        vec = self.embedder.encode([normalize_query(query)], PRIORITY_QUERY)[0]
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(
+        self, query: str, language: str, chunks: List[Dict[str, Any]]
+    ) -> Optional[str]:
+        key = self._context_key(language, chunks)
+        with self._lock:
+            candidates = list(self._by_key.get(key, ()))
+        if not candidates:
+            self._count("misses")
+            return None
+
+        vector = self._query_vector(query)
+        now = time.time()
+        with self._lock:
+            best, best_score = None, self.threshold
+            for entry_id in candidates:
+                entry = self._entries.get(entry_id)
+                if entry is None:
+                    continue
+                if now - entry.created_at > self.ttl:
+                    self._drop(entry_id)
+                    continue
+                score = float(np.dot(vector, entry.vector))
+                if score >= best_score:
+                    best, best_score = entry_id, score
+            if best is None:
+                self._counts["misses"] += 1
+                return None
+            self._entries.move_to_end(best)
+            self._counts["hits"] += 1
+            return self._entries[best].answer
+
+    def store(
+        self, query: str, language: str, chunks: List[Dict[str, Any]], answer: str
+    ):
+        key = self._context_key(language, chunks)
+        entry = _Entry(
+            key, self._query_vector(query), answer, (c["file_id"] for c in chunks)
+        )
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            self._by_key.setdefault(key, set()).add(entry_id)
+            for file_id in entry.files:
+                self._by_file.setdefault(file_id, set()).add(entry_id)
+            while len(self._entries) > self.max_items:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_file(self, file_id: str):
+        with self._lock:
+            entry_ids = self._by_file.pop(file_id, set())
+            for entry_id in entry_ids:
+                self._drop(entry_id)
+            if entry_ids:
+                self._counts["invalidations"] += len(entry_ids)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._entries)
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "hit_rate": round(counts["hits"] / lookups, 4) if lookups else 0.0,
+            "items": size,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _drop(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        ids = self._by_key.get(entry.key)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_key[entry.key]
+        for file_id in entry.files:
+            ids = self._by_file.get(file_id)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._by_file[file_id]
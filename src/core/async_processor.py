@@ -1,12 +1,15 @@
-import uuid
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from core.processor import extract_text
-from core.chunker import chunk_text
+from typing import List, Dict, Any, Optional, Callable, Set
+from core.processor import iter_sections
+from core.chunker import iter_chunks
 from core.embeddings import EmbeddingManager
-from core.registry import FileRegistry
-from config.constants import MAX_CONCURENT_FILES, BATCH_SIZE
+from core.registry import FileRegistry, StoredState
+from config.constants import MAX_CONCURENT_FILES, BATCH_SIZE, INGEST_QUEUE_SIZE
+
+ProgressCallback = Callable[[Path, Dict[str, Any]], None]
 
 
 class FileProcessor:
@@ -15,72 +18,219 @@ class FileProcessor:
         embedder: Optional[EmbeddingManager] = None,
         max_concurrent: int = MAX_CONCURENT_FILES,
         batch_size: int = BATCH_SIZE,
+        queue_size: int = INGEST_QUEUE_SIZE,
     ):
         self.embedder = embedder or EmbeddingManager()
         self.semaphore = asyncio.Semaphore(max_concurrent)
+        # producers block on their full queue for as long as a file is being
+        # ingested, so they get their own threads; in the default executor
+        # they could take every worker and starve the embedding consumers
+        self._producers = ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix="ingest-producer"
+        )
         self.registry = FileRegistry()
         self.batch_size = batch_size
+        self.queue_size = queue_size
 
-    async def process_files(self, file_paths: List[Path]) -> Dict[str, Dict[str, Any]]:
+    async def process_files(
+        self, file_paths: List[Path], on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Dict[str, Any]]:
         results: Dict[str, Dict[str, Any]] = {}
+        states = await asyncio.to_thread(
+            self.registry.fetch_states, [fp.stem for fp in file_paths]
+        )
         await asyncio.gather(
-            *(self._process_file_with_semaphore(results, fp) for fp in file_paths)
+            *(
+                self._process_file_with_semaphore(
+                    results, fp, states.get(fp.stem), on_progress
+                )
+                for fp in file_paths
+            )
         )
         return results
 
+    async def remove_files(
+        self, file_paths: List[Path], on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        results: Dict[str, Dict[str, Any]] = {}
+        for file_path in file_paths:
+            file_id = file_path.stem
+            try:
+                removed = await asyncio.to_thread(self.embedder.delete_file, file_id)
+                self.registry.delete(file_id)
+                results[file_id] = {
+                    "status": "removed",
+                    "chunks": removed,
+                    "error": None,
+                }
+            except Exception as e:
+                print(f"Failed to remove {file_path.name}: {e}")
+                results[file_id] = {"status": "error", "chunks": 0, "error": str(e)}
+            self._report(on_progress, file_path, results[file_id])
+        return results
+
     async def _process_file_with_semaphore(
-        self, results: Dict[str, Dict[str, Any]], file_path: Path
+        self,
+        results: Dict[str, Dict[str, Any]],
+        file_path: Path,
+        stored: Optional[StoredState] = None,
+        on_progress: Optional[ProgressCallback] = None,
     ):
         async with self.semaphore:
             file_id = file_path.stem
             file_ext = file_path.suffix.lower().replace(".", "") or "unknown"
 
-            if self.registry.has_changed(file_path) is False:
+            changed, file_hash, st = await asyncio.to_thread(
+                self.registry.check, file_path, stored
+            )
+            if not changed:
                 results[file_id] = {"status": "skipped", "chunks": 0, "error": None}
                 print(f"Skipped {file_path.name} — unchanged.")
+                self._report(on_progress, file_path, results[file_id])
                 return
 
+            self._report(on_progress, file_path, {"status": "processing", "chunks": 0})
             try:
-                chunk_count = await self.extract_and_chunk_from_file(
-                    file_path, file_id, file_ext
+                counts = await self.extract_and_chunk_from_file(
+                    file_path, file_id, file_ext, on_progress
                 )
-                results[file_id] = {
-                    "status": "processed",
-                    "chunks": chunk_count,
-                    "error": None,
-                }
-                self.registry.upsert(file_path, chunk_count)
+                results[file_id] = {"status": "processed", **counts, "error": None}
+                self.registry.upsert(file_path, counts["chunks"], file_hash, st)
             except Exception as e:
                 print(f"Failed to process {file_path.name}: {e}")
                 results[file_id] = {"status": "error", "chunks": 0, "error": str(e)}
+            self._report(on_progress, file_path, results[file_id])
 
     async def extract_and_chunk_from_file(
-        self, file_path: Path, file_id: str, file_ext: str
-    ) -> int:
+        self,
+        file_path: Path,
+        file_id: str,
+        file_ext: str,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, int]:
+        """
+        Re-ingests a file as a diff against what is already in the collection:
+        only new chunks are embedded, chunks that disappeared are deleted and
+        unchanged ones are left alone. If ingestion fails, the chunks it added
+        are deleted again and the old ones kept.
+
+        Extraction and chunking run in a producer thread that hands batches of
+        new chunks to the event loop through a bounded queue, so embedding
+        starts with the first batch and memory doesn't grow with the file.
+        """
         print(f"Processing {file_path.name}...")
-        text = await asyncio.to_thread(extract_text, file_path)
-        if not text.strip():
-            print(f"Skipping {file_path.name} — no readable text.")
-            return 0
+        existing = await asyncio.to_thread(self.embedder.get_file_chunk_ids, file_id)
 
-        chunks = await asyncio.to_thread(chunk_text, text)
-        if not chunks:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        seen: Set[str] = set()
+        stop = threading.Event()
+        loop = asyncio.get_running_loop()
+        producer = asyncio.ensure_future(
+            loop.run_in_executor(
+                self._producers,
+                self._produce_batches,
+                file_path,
+                file_id,
+                file_ext,
+                existing,
+                seen,
+                queue,
+                loop,
+                stop,
+            )
+        )
+
+        added = 0
+        completed = False
+        try:
+            while (batch := await queue.get()) is not None:
+                await asyncio.to_thread(self.embedder.encode_and_store_chunks, batch)
+                added += len(batch)
+                self._report(
+                    on_progress, file_path, {"status": "processing", "chunks": added}
+                )
+            await producer
+            completed = True
+        finally:
+            # unblock a producer waiting on a full queue; it checks `stop`
+            # before every put, so one drain is enough
+            stop.set()
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.gather(producer, return_exceptions=True)
+            if not completed:
+                # take back what this run added so the file stays at its
+                # previous version instead of a mix of old and new chunks
+                await asyncio.to_thread(
+                    self.embedder.delete_chunks, list(seen - existing)
+                )
+
+        if not seen:
             print(f"No chunks generated for {file_path.name}.")
-            return 0
-
-        chunks_metadata: List[Dict[str, Any]] = [
-            {
-                "text": chunk,
-                "file_id": file_id,
-                "file_ext": file_ext,
-                "uid": uuid.uuid4().hex[:8],
-            }
-            for chunk in chunks
-        ]
-
-        for i in range(0, len(chunks_metadata), self.batch_size):
-            batch = chunks_metadata[i : i + self.batch_size]
-            await asyncio.to_thread(self.embedder.encode_and_store_chunks, batch)
-
-        print(f"Completed {file_path.name} ({len(chunks)} chunks)")
-        return len(chunks)
+        removed = [id_ for id_ in existing if id_ not in seen]
+        await asyncio.to_thread(self.embedder.delete_chunks, removed)
+
+        counts = {
+            "chunks": len(seen),
+            "added": added,
+            "removed": len(removed),
+            "unchanged": len(seen) - added,
+        }
+        print(
+            f"Completed {file_path.name} ({counts['chunks']} chunks: "
+            f"{counts['added']} added, {counts['removed']} removed, "
+            f"{counts['unchanged']} unchanged)"
+        )
+        return counts
+
+    def _produce_batches(
+        self,
+        file_path: Path,
+        file_id: str,
+        file_ext: str,
+        existing: Set[str],
+        seen: Set[str],
+        queue: asyncio.Queue,
+        loop: asyncio.AbstractEventLoop,
+        stop: threading.Event,
+    ):
+        def put(item: Optional[List[Dict[str, Any]]]):
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        batch: List[Dict[str, Any]] = []
+        try:
+            for page, text in iter_chunks(iter_sections(file_path)):
+                if stop.is_set():
+                    return
+                meta: Dict[str, Any] = {
+                    "text": text,
+                    "file_id": file_id,
+                    "file_ext": file_ext,
+                }
+                if page is not None:
+                    meta["page"] = page
+                # identical paragraphs within a file share one content-addressed chunk
+                chunk_id = self.embedder.chunk_id(meta)
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                if chunk_id in existing:
+                    continue
+                batch.append(meta)
+                if len(batch) >= self.batch_size:
+                    put(batch)
+                    batch = []
+            if batch:
+                put(batch)
+        finally:
+            put(None)
+
+    def _report(
+        self,
+        on_progress: Optional[ProgressCallback],
+        file_path: Path,
+        progress: Dict[str, Any],
+    ):
+        if on_progress:
+            on_progress(file_path, progress)
@@ -1,15 +1,133 @@
-from typing import List
-
-
-def chunk_text(text: str, max_tokens: int = 300) -> List[str]:
-    paragraphs = text.split("\n")
-    chunks, current = [], ""
-    for para in paragraphs:
-        if len(current) + len(para) < max_tokens:
-            current += " " + para
-        else:
-            chunks.append(current.strip())
-            current = para
-    if current:
-        chunks.append(current.strip())
-    return chunks
+import re
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+from config.constants import (
+    SENTENCE_TRANSFORMER_MODEL,
+    CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+)
+
+Offsets = List[Tuple[int, int]]
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+# without a tokenizer, words count as tokens; runs longer than this are split
+# so that a giant word (base64, a URL, "AAAA…") still gets cut into chunks
+_FALLBACK_MAX_TOKEN_CHARS = 8
+_FALLBACK_TOKEN_RE = re.compile(
+    rf"\w{{1,{_FALLBACK_MAX_TOKEN_CHARS}}}|[^\w\s]", re.UNICODE
+)
+
+_tokenizer = None
+_tokenizer_loaded = False
+# fast tokenizers raise "Already borrowed" when called from several threads
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            _tokenizer_loaded = True
+            try:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(
+                    f"sentence-transformers/{SENTENCE_TRANSFORMER_MODEL}"
+                )
+            except Exception as e:
+                print(f"Tokenizer unavailable, counting regex tokens instead: {e}")
+        return _tokenizer
+
+
+def token_offsets(texts: List[str]) -> List[Offsets]:
+    # one batched tokenizer call per page instead of one per sentence
+    if not texts:
+        return []
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [[m.span() for m in _FALLBACK_TOKEN_RE.finditer(text)] for text in texts]
+    with _tokenizer_lock:
+        encoded = tokenizer(
+            texts, add_special_tokens=False, return_offsets_mapping=True
+        )
+    return [[tuple(span) for span in spans] for spans in encoded["offset_mapping"]]
+
+
+def split_units(text: str) -> List[str]:
+    # paragraphs, then sentences; line breaks inside a paragraph are layout
+    units = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = " ".join(paragraph.split())
+        units.extend(s for s in _SENTENCE_RE.split(paragraph) if s)
+    return units
+
+
+def _fit_units(units: List[str], max_tokens: int) -> List[Tuple[str, int]]:
+    # sentences longer than the limit are cut at token boundaries
+    fitted = []
+    for unit, offsets in zip(units, token_offsets(units)):
+        if len(offsets) <= max_tokens:
+            fitted.append((unit, len(offsets)))
+            continue
+        for i in range(0, len(offsets), max_tokens):
+            window = offsets[i : i + max_tokens]
+            piece = unit[window[0][0] : window[-1][1]].strip()
+            if piece:
+                fitted.append((piece, len(window)))
+    return fitted
+
+
+def iter_chunks(
+    sections: Iterable[Tuple[Optional[int], str]],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[Tuple[Optional[int], str]]:
+    """
+    Packs whole sentences into chunks of at most `max_tokens` model tokens,
+    repeating trailing sentences worth up to `overlap` tokens at the start of
+    the next chunk. Consecutive sections of the same page (or of a page-less
+    transcript) flow into each other; a chunk never spans two pages.
+    """
+    page: Optional[int] = None
+    current: List[Tuple[str, int]] = []
+    used = 0
+
+    def emit() -> Optional[str]:
+        text = " ".join(unit for unit, _ in current).strip()
+        return text or None
+
+    for section_page, text in sections:
+        if section_page != page:
+            if current and (chunk := emit()):
+                yield page, chunk
+            page, current, used = section_page, [], 0
+
+        for unit, n_tokens in _fit_units(split_units(text), max_tokens):
+            if current and used + n_tokens > max_tokens:
+                if chunk := emit():
+                    yield page, chunk
+                carried: List[Tuple[str, int]] = []
+                carried_tokens = 0
+                for prev, prev_tokens in reversed(current):
+                    if carried_tokens + prev_tokens > overlap:
+                        break
+                    carried.insert(0, (prev, prev_tokens))
+                    carried_tokens += prev_tokens
+                # overlap never pushes the next chunk over the limit
+                while carried and carried_tokens + n_tokens > max_tokens:
+                    carried_tokens -= carried.pop(0)[1]
+                current, used = carried, carried_tokens
+            current.append((unit, n_tokens))
+            used += n_tokens
+
+    if current and (chunk := emit()):
+        yield page, chunk
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+) -> List[str]:
+    return [chunk for _, chunk in iter_chunks([(None, text)], max_tokens, overlap)]
@@ -0,0 +1,109 @@
+import threading
+from typing import Any, Dict, List, Optional
+from core.retriever import Retriever
+from core.lexical_index import tokenize
+from config.constants import (
+    RERANK_MODEL,
+    RERANK_BATCH_SIZE,
+    RERANK_OVERFETCH,
+    CONTEXT_TOKEN_BUDGET,
+    DUPLICATE_CHUNK_SIMILARITY,
+)
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = RERANK_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                self._model = CrossEncoder(self.model_name)
+            return self._model
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        if not texts:
+            return []
+        scores = self.model.predict(
+            [(query, t) for t in texts],
+            batch_size=RERANK_BATCH_SIZE,
+            show_progress_bar=False,
+        )
+        return [float(s) for s in scores]
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        encoded = self.model.tokenizer(texts, add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+
+class ContextBuilder:
+    """
+    Retrieval stage between Retriever.retrieve() and the LLM prompt:
+    over-fetch candidates, re-rank them with a cross-encoder, drop
+    near-duplicates and pack the best chunks into a token budget.
+    """
+
+    def __init__(
+        self,
+        retriever: Retriever,
+        reranker: Optional[CrossEncoderReranker] = None,
+        overfetch: int = RERANK_OVERFETCH,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        duplicate_similarity: float = DUPLICATE_CHUNK_SIMILARITY,
+    ):
+        self.retriever = retriever
+        self.reranker = reranker or CrossEncoderReranker()
+        self.overfetch = overfetch
+        self.token_budget = token_budget
+        self.duplicate_similarity = duplicate_similarity
+
+    def build(
+        self, query: str, top_k: int, token_budget: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        candidates = self.retriever.retrieve(query, top_k=top_k * self.overfetch)
+        if not candidates:
+            return []
+
+        if query.strip():
+            scores = self.reranker.score(query, [c["text"] for c in candidates])
+            for chunk, score in zip(candidates, scores):
+                chunk["rerank_score"] = score
+            candidates.sort(key=lambda c: c["rerank_score"], reverse=True)
+
+        candidates = self._drop_duplicates(candidates)
+        return self._pack(candidates, top_k, token_budget or self.token_budget)
+
+    def _drop_duplicates(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        kept: List[Dict[str, Any]] = []
+        kept_tokens: List[set] = []
+        for chunk in chunks:
+            tokens = set(tokenize(chunk["text"]))
+            if any(
+                len(tokens & other) / (len(tokens | other) or 1)
+                >= self.duplicate_similarity
+                for other in kept_tokens
+            ):
+                continue
+            kept.append(chunk)
+            kept_tokens.append(tokens)
+        return kept
+
+    def _pack(
+        self, chunks: List[Dict[str, Any]], top_k: int, token_budget: int
+    ) -> List[Dict[str, Any]]:
+        lengths = self.reranker.count_tokens([c["text"] for c in chunks])
+        packed, used = [], 0
+        for chunk, n_tokens in zip(chunks, lengths):
+            if len(packed) >= top_k:
+                break
+            # the best chunk always goes in, even if it alone exceeds the budget
+            if packed and used + n_tokens > token_budget:
+                continue
+            packed.append(chunk)
+            used += n_tokens
+        return packed
@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Sequence, Union
+from config.constants import (
+    DB_BUSY_TIMEOUT,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+    DB_CACHED_STATEMENTS,
+)
+
+
+# a SQL statement, or a function for steps that depend on the current schema
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+def add_column(table: str, column: str, decl: str) -> MigrationStep:
+    # ALTER TABLE ... ADD COLUMN, skipped when a legacy table already has it
+    def step(conn: sqlite3.Connection):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    return step
+
+
+class Database:
+    """
+    One SQLite file shared by every store in the process. Each thread keeps
+    its own connection (opened once, in WAL mode, so readers don't wait for
+    writers), with SQLite's prepared-statement cache kept warm across calls.
+
+    Connections run in autocommit mode; writes that must be atomic go
+    through transaction(), which nests via savepoints so a store method can
+    open one and still be combined with others by its caller:
+
+        with db.transaction():
+            quiz_store.record_answer(...)
+            user_manager.update_topic_performance(...)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT,
+            isolation_level=None,
+            cached_statements=DB_CACHED_STATEMENTS,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        depth = self._local.depth
+        if depth == 0:
+            # take the write lock up front instead of failing to upgrade later
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT sp_{depth}")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO sp_{depth}")
+                conn.execute(f"RELEASE sp_{depth}")
+            raise
+        else:
+            conn.execute("COMMIT" if depth == 0 else f"RELEASE sp_{depth}")
+        finally:
+            self._local.depth = depth
+
+    def migrate(self, component: str, migrations: Sequence[Sequence[MigrationStep]]):
+        """
+        Brings `component`'s tables up to date. migrations[i] is the list of
+        statements that takes it from version i to i + 1; each one runs in its
+        own transaction together with the bump in schema_migrations, so a
+        failed step is retried on the next start and concurrent processes
+        apply it only once. Append new steps, never edit applied ones.
+        """
+        conn = self.connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                component TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        for version, statements in enumerate(migrations, start=1):
+            with self.transaction() as conn:
+                row = conn.execute(
+                    "SELECT version FROM schema_migrations WHERE component=?",
+                    (component,),
+                ).fetchone()
+                if row and row[0] >= version:
+                    continue
+                for step in statements:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(
+                    """
+                    INSERT INTO schema_migrations (component, version) VALUES (?, ?)
+                    ON CONFLICT(component) DO UPDATE
+                    SET version=excluded.version, applied_at=CURRENT_TIMESTAMP
+                    """,
+                    (component, version),
+                )
+                print(f"Applied {component} schema migration {version}.")
+
+    def close(self):
+        # closes this thread's connection; other threads keep theirs
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_databases: Dict[str, Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path: str) -> Database:
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = Database(path)
+        return _databases[path]
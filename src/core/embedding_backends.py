@@ -0,0 +1,184 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type
+import numpy as np
+from config.constants import (
+    SENTENCE_TRANSFORMER_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MAX_SEQ_LENGTH,
+    ONNX_MODEL_DIR,
+    ONNX_THREADS,
+)
+
+
+class EmbeddingBackend(ABC):
+    """
+    Turns a batch of texts into a (len(texts), dim) float32 array. The model
+    is loaded on the first encode() (or an explicit load()), not on
+    construction.
+    """
+
+    name = ""
+
+    def __init__(self, model_name: str = SENTENCE_TRANSFORMER_MODEL):
+        self.model_name = model_name
+        self.loaded = False
+        self._load_lock = threading.Lock()
+
+    @property
+    def cache_namespace(self) -> str:
+        # vectors from different backends differ slightly, so don't mix them
+        return f"{self.model_name}@{self.name}"
+
+    def load(self):
+        with self._load_lock:
+            if not self.loaded:
+                print(f"Loading '{self.model_name}' ({self.name})...")
+                self._load()
+                self.loaded = True
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        self.load()
+        return self._encode(texts)
+
+    @abstractmethod
+    def _load(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    name = "sentence-transformers"
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(self.model_name)
+
+    @property
+    def cache_namespace(self) -> str:
+        # the reference fp32 model keeps the cache entries written before
+        # backends existed
+        return self.model_name
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=len(texts) or 1, show_progress_bar=False
+        )
+
+
+class OnnxInt8Backend(EmbeddingBackend):
+    """
+    The same transformer exported to ONNX and dynamically quantized to int8
+    weights, run with ONNX Runtime on CPU followed by the mean pooling the
+    sentence-transformers model uses. The export happens once and is
+    stored under ONNX_MODEL_DIR.
+    """
+
+    name = "onnx-int8"
+
+    def __init__(
+        self,
+        model_name: str = SENTENCE_TRANSFORMER_MODEL,
+        model_dir: str = ONNX_MODEL_DIR,
+        threads: int = ONNX_THREADS,
+    ):
+        super().__init__(model_name)
+        self.model_dir = model_dir
+        self.threads = threads
+        self.hub_name = f"sentence-transformers/{model_name}"
+
+    def _load(self):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.hub_name)
+
+        export_dir = os.path.join(self.model_dir, self.model_name)
+        int8_path = os.path.join(export_dir, "model_int8.onnx")
+        if not os.path.exists(int8_path):
+            self._export(export_dir, int8_path)
+
+        options = ort.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(
+            int8_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _export(self, export_dir: str, int8_path: str):
+        import torch
+        from transformers import AutoModel
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print(f"Exporting {self.hub_name} to ONNX (int8)...")
+        os.makedirs(export_dir, exist_ok=True)
+        fp32_path = os.path.join(export_dir, "model_fp32.onnx")
+
+        class LastHiddenState(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, input_ids, attention_mask):
+                return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+        model = LastHiddenState(AutoModel.from_pretrained(self.hub_name)).eval()
+        dummy = self.tokenizer(["an example sentence"], return_tensors="pt")
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": dynamic,
+                    "attention_mask": dynamic,
+                    "last_hidden_state": dynamic,
+                },
+                opset_version=14,
+                dynamo=False,
+            )
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=EMBEDDING_MAX_SEQ_LENGTH,
+            return_tensors="np",
+        )
+        feed = {
+            k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names
+        }
+        hidden = self.session.run(None, feed)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        summed = (hidden * mask).sum(axis=1)
+        return (summed / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+
+BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    OnnxInt8Backend.name: OnnxInt8Backend,
+}
+
+
+def create_backend(
+    name: str = EMBEDDING_BACKEND, model_name: str = SENTENCE_TRANSFORMER_MODEL
+) -> EmbeddingBackend:
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend '{name}', expected one of {sorted(BACKENDS)}"
+        )
+    return BACKENDS[name](model_name)
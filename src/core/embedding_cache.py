@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from core.db import get_database
+from config.constants import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_SIZE
+
+# SQLite's default limit on host parameters per statement
+_MAX_PARAMS = 900
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of text embeddings keyed by (model name, sha1(text)):
+    an in-memory LRU in front of a SQLite table of float32 blobs.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        db_path: str = EMBEDDING_CACHE_PATH,
+        max_items: int = EMBEDDING_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.db_path = db_path
+        self.db = get_database(db_path)
+        self.max_items = max_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._init_db()
+
+    def _init_db(self):
+        with self.db.transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT,
+                    text_hash TEXT,
+                    vector BLOB,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        keys = [self.key(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for k in keys:
+                vec = self._memory.get(k)
+                if vec is not None:
+                    self._memory.move_to_end(k)
+                    found[k] = vec
+        in_memory = set(found)
+
+        missing = list({k for k in keys if k not in found})
+        if missing:
+            disk = self._load(missing)
+            found.update(disk)
+            with self._lock:
+                for k, vec in disk.items():
+                    self._remember(k, vec)
+
+        with self._lock:
+            for k in keys:
+                if k in in_memory:
+                    self._counts["memory_hits"] += 1
+                elif k in found:
+                    self._counts["disk_hits"] += 1
+                else:
+                    self._counts["misses"] += 1
+
+        return [found.get(k) for k in keys]
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        rows = []
+        with self._lock:
+            for text, vec in zip(texts, vectors):
+                k = self.key(text)
+                vec = np.asarray(vec, dtype=np.float32)
+                self._remember(k, vec)
+                rows.append((self.model_name, k, vec.tobytes()))
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, text_hash, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._memory)
+        lookups = sum(counts.values())
+        hits = counts["memory_hits"] + counts["disk_hits"]
+        return {
+            **counts,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_items": size,
+        }
+
+    def _remember(self, key: str, vec: np.ndarray):
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        loaded: Dict[str, np.ndarray] = {}
+        conn = self.db.connection()
+        for i in range(0, len(keys), _MAX_PARAMS):
+            batch = keys[i : i + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"""
+                SELECT text_hash, vector FROM embedding_cache
+                WHERE model=? AND text_hash IN ({placeholders})
+                """,
+                [self.model_name, *batch],
+            ).fetchall()
+            for k, blob in rows:
+                loaded[k] = np.frombuffer(blob, dtype=np.float32)
+        return loaded
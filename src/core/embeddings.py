@@ -1,55 +1,263 @@
+import time
+import queue
+import asyncio
 import hashlib
-from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer
-import chromadb
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Any, Set, Callable, Optional
+import numpy as np
+from core.embedding_cache import EmbeddingCache
+from core.embedding_backends import EmbeddingBackend, create_backend
+from core.lexical_index import LexicalIndex
 from config.constants import (
     CHROMA_COLLECTION_NAME,
     CHROMA_DB_SAVINGS,
-    SENTENCE_TRANSFORMER_MODEL,
+    EMBED_MAX_BATCH,
+    EMBED_MAX_WAIT,
+    EMBED_QUERY_MAX_WAIT,
+    LEXICAL_BOOTSTRAP_BATCH,
 )
 
+PRIORITY_QUERY = 0
+PRIORITY_INGEST = 1
+
+
+class EmbeddingScheduler:
+    """
+    Single worker thread that merges pending texts from every caller (ingestion
+    batches of all files, live queries) into one model.encode call per batch.
+    Batches close when they reach `max_batch` texts or the wait deadline passes;
+    queries are dequeued ahead of ingestion and don't wait for a full batch.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch: int = EMBED_MAX_BATCH,
+        max_wait: float = EMBED_MAX_WAIT,
+        query_max_wait: float = EMBED_QUERY_MAX_WAIT,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.query_max_wait = query_max_wait
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, texts: List[str], priority: int = PRIORITY_INGEST) -> Future:
+        future: Future = Future()
+        if not texts:
+            future.set_result(np.empty((0, 0), dtype=np.float32))
+            return future
+        self._ensure_worker()
+        self._queue.put((priority, next(self._seq), texts, future))
+        return future
+
+    def encode(self, texts: List[str], priority: int = PRIORITY_INGEST) -> np.ndarray:
+        return self.submit(texts, priority).result()
+
+    async def aencode(
+        self, texts: List[str], priority: int = PRIORITY_INGEST
+    ) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(texts, priority))
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self) -> list:
+        first = self._queue.get()
+        batch, size = [first], len(first[2])
+        wait = self.query_max_wait if first[0] == PRIORITY_QUERY else self.max_wait
+        deadline = time.monotonic() + wait
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if size + len(item[2]) > self.max_batch:
+                # keeps its (priority, seq) slot, so it goes first next round
+                self._queue.put(item)
+                break
+            batch.append(item)
+            size += len(item[2])
+        return batch
+
+    def _run(self):
+        while True:
+            # drops requests whose caller gave up (e.g. a cancelled aencode);
+            # the rest can no longer be cancelled, so setting them is safe
+            batch = [
+                item
+                for item in self._next_batch()
+                if item[3].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            texts = [text for _, _, item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = self.encode_fn(texts)
+            except BaseException as e:
+                # the worker must survive, or every later caller waits forever
+                for *_, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for _, _, item_texts, future in batch:
+                future.set_result(vectors[offset : offset + len(item_texts)])
+                offset += len(item_texts)
+
 
 class EmbeddingManager:
-    def __init__(self, collection_name: str = CHROMA_COLLECTION_NAME):
-        self.client = chromadb.PersistentClient(path=CHROMA_DB_SAVINGS)
-        self.model = SentenceTransformer(SENTENCE_TRANSFORMER_MODEL)
-        self.collection = self.client.get_or_create_collection(collection_name)
+    def __init__(
+        self,
+        collection_name: str = CHROMA_COLLECTION_NAME,
+        backend: Optional[EmbeddingBackend] = None,
+    ):
+        # nothing heavy happens here: the model loads on the first encode and
+        # Chroma opens on first access to `collection`
+        self.collection_name = collection_name
+        self._collection = None
+        self._collection_lock = threading.Lock()
+        self.backend = backend or create_backend()
+        self.scheduler = EmbeddingScheduler(self._encode_batch)
+        self.cache = EmbeddingCache(self.backend.cache_namespace)
+        # mirrors the collection for keyword search; filled from Chroma on
+        # first use and kept in sync by every add/delete below
+        self.lexical = LexicalIndex()
+        self._lexical_ready = False
+        self._lexical_lock = threading.Lock()
 
-    def encode_and_store_chunks(self, chunks: List[Dict[str, Any]]):
-        if not chunks:
-            return
+    @property
+    def collection(self):
+        with self._collection_lock:
+            if self._collection is None:
+                import chromadb
+
+                client = chromadb.PersistentClient(path=CHROMA_DB_SAVINGS)
+                self._collection = client.get_or_create_collection(self.collection_name)
+            return self._collection
 
-        for idx, c in enumerate(chunks):
-            c.setdefault("uid", str(idx))
-            c["hash"] = self._hash_text(c["text"])
+    def warm_up(self):
+        self.backend.load()
+        self._ensure_lexical()  # also opens the collection
 
-        ids = [f"{c['file_id']}_{c['uid']}" for c in chunks]
-        existing = set(self.collection.get(ids=ids)["ids"])
-        new_chunks = [c for c, id_ in zip(chunks, ids) if id_ not in existing]
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        return self.backend.encode(texts)
+
+    def encode(
+        self, texts: List[str], priority: int = PRIORITY_INGEST, store: bool = True
+    ) -> np.ndarray:
+        # store=False for one-off user input that shouldn't grow the cache
+        cached = self.cache.get_many(texts)
+        # encode each distinct missing text once, even if repeated in the batch
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        fresh: Dict[str, np.ndarray] = {}
+        if missing:
+            encoded = self.scheduler.encode(missing, priority)
+            if store:
+                self.cache.put_many(missing, encoded)
+            fresh = dict(zip(missing, encoded))
+        vectors = [v if v is not None else fresh[t] for t, v in zip(texts, cached)]
+        return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def chunk_id(self, chunk: Dict[str, Any]) -> str:
+        # content-addressed, so re-ingesting unchanged text maps to the same id
+        chunk.setdefault("hash", self._hash_text(chunk["text"]))
+        return f"{chunk['file_id']}_{chunk['hash']}"
+
+    def encode_and_store_chunks(self, chunks: List[Dict[str, Any]]) -> int:
+        if not chunks:
+            return 0
+
+        by_id = {self.chunk_id(c): c for c in chunks}
+        existing = set(self.collection.get(ids=list(by_id), include=[])["ids"])
+        new_chunks = [c for id_, c in by_id.items() if id_ not in existing]
 
         if not new_chunks:
-            return
+            return 0
 
         texts = [c["text"] for c in new_chunks]
         metadatas = [{k: v for k, v in c.items() if k != "text"} for c in new_chunks]
-        ids = [f"{c['file_id']}_{c['uid']}" for c in new_chunks]
+        ids = [self.chunk_id(c) for c in new_chunks]
 
         print(f"Adding {len(new_chunks)} new chunks to collection...")
-        embeddings = self.model.encode(texts, show_progress_bar=False)
+        embeddings = self.encode(texts, PRIORITY_INGEST)
         self.collection.add(
             documents=texts,
             embeddings=embeddings.tolist(),
             ids=ids,
             metadatas=metadatas,
         )
+        with self._lexical_lock:
+            self.lexical.add(zip(ids, texts))
         print(f"Collection now contains {self.collection.count()} total documents.")
+        return len(new_chunks)
+
+    def get_chunk_ids(self) -> List[str]:
+        return self.collection.get(include=[])["ids"]
+
+    def get_file_chunk_ids(self, file_id: str) -> Set[str]:
+        return set(self.collection.get(where={"file_id": file_id}, include=[])["ids"])
+
+    def delete_chunks(self, ids: List[str]):
+        if ids:
+            self.collection.delete(ids=ids)
+            with self._lexical_lock:
+                self.lexical.remove(ids)
+
+    def delete_file(self, file_id: str) -> int:
+        existing = list(self.get_file_chunk_ids(file_id))
+        if existing:
+            self.delete_chunks(existing)
+            print(f"Removed {len(existing)} chunks of {file_id} from collection.")
+        return len(existing)
+
+    def count(self) -> int:
+        return self.collection.count()
 
     def query(self, query_text: str, top_k: int):
-        query_vec = self.model.encode([query_text])[0]
+        query_vec = self.encode([query_text], PRIORITY_QUERY)[0]
         results = self.collection.query(
             query_embeddings=[query_vec.tolist()], n_results=top_k
         )
         return results
 
+    def get_chunks(self, ids: List[str]):
+        return self.collection.get(ids=ids, include=["documents", "metadatas"])
+
+    def lexical_search(self, query_text: str, top_k: int):
+        self._ensure_lexical()
+        return self.lexical.search(query_text, top_k)
+
+    def _ensure_lexical(self):
+        with self._lexical_lock:
+            if self._lexical_ready:
+                return
+            offset = 0
+            while True:
+                page = self.collection.get(
+                    include=["documents"],
+                    limit=LEXICAL_BOOTSTRAP_BATCH,
+                    offset=offset,
+                )
+                if not page["ids"]:
+                    break
+                self.lexical.add(zip(page["ids"], page["documents"]))
+                offset += len(page["ids"])
+            self._lexical_ready = True
+            print(f"Lexical index built over {len(self.lexical)} chunks.")
+
     def _hash_text(self, text: str) -> str:
         return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
@@ -0,0 +1,152 @@
+import uuid
+import time
+import asyncio
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+from core.async_processor import FileProcessor
+from core.utils.file_discovery import discover_files
+from config.constants import UPLOAD_DIR, INGEST_JOB_HISTORY
+
+
+class IngestionJob:
+    def __init__(
+        self,
+        files: Optional[List[Path]] = None,
+        removed: Optional[List[Path]] = None,
+    ):
+        self.job_id = f"job_{uuid.uuid4().hex[:8]}"
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # None means "everything in the upload dir", resolved when the job runs
+        self.requested_files = files
+        self.removed = removed or []
+        self.files: Dict[str, Dict[str, Any]] = {
+            f.name: {"status": "queued", "chunks": 0}
+            for f in (files or []) + self.removed
+        }
+
+    def update(self, file_path: Path, progress: Dict[str, Any]):
+        self.files.setdefault(file_path.name, {}).update(progress)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "files": self.files,
+        }
+
+
+class IngestionWorker:
+    """
+    Owns the FileProcessor and runs ingestion jobs one after another in the
+    background, so request handlers only ever read the already-built index.
+    """
+
+    def __init__(
+        self,
+        processor: FileProcessor,
+        upload_dir: str = UPLOAD_DIR,
+        history: int = INGEST_JOB_HISTORY,
+    ):
+        self.processor = processor
+        self.upload_dir = Path(upload_dir)
+        self.history = history
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def submit(
+        self,
+        files: Optional[List[Path]] = None,
+        removed: Optional[List[Path]] = None,
+    ) -> IngestionJob:
+        if self._queue is None:
+            raise RuntimeError("Ingestion worker is not running.")
+        job = IngestionJob(files, removed)
+        self.jobs[job.job_id] = job
+        self._trim_history()
+        self._queue.put_nowait(job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        return list(self.jobs.values())
+
+    def is_busy(self) -> bool:
+        return any(job.status in ("queued", "running") for job in self.jobs.values())
+
+    async def _run(self):
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: IngestionJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            if job.removed:
+                await self.processor.remove_files(job.removed, on_progress=job.update)
+
+            files = job.requested_files
+            if files is None:
+                files = await asyncio.to_thread(discover_files, self.upload_dir)
+                for f in files:
+                    job.update(f, {"status": "queued", "chunks": 0})
+
+            results = {}
+            if files:
+                results = await self.processor.process_files(
+                    files, on_progress=job.update
+                )
+            failed = [r for r in results.values() if r["status"] == "error"]
+            job.status = "failed" if failed and len(failed) == len(results) else "done"
+        except Exception as e:
+            print(f"Ingestion job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+        print(f"Ingestion job {job.job_id} finished with status '{job.status}'.")
+
+    async def handle_changes(self, changed: List[Path], deleted: List[Path]):
+        # UploadWatcher callback: queue only what actually changed on disk
+        self.submit(changed, deleted)
+
+    def _trim_history(self):
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status in ("done", "failed")
+        ]
+        while len(self.jobs) > self.history and finished:
+            self.jobs.pop(finished.pop(0))
@@ -0,0 +1,146 @@
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from config.constants import BM25_K1, BM25_B
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class LexicalIndex:
+    """
+    In-process BM25 inverted index over chunk texts.
+
+    Postings are appended as (row, term, tf) triplets when chunks are added
+    and rows are tombstoned when chunks are removed; the BM25 weight matrix
+    (docs x terms, CSC so query terms are column slices) is rebuilt lazily on
+    the next search after a change, so scoring a query is one sparse
+    column-sum.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._vocab: Dict[str, int] = {}
+        self._row_of: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._lengths: List[int] = []
+        self._post_rows: List[np.ndarray] = []
+        self._post_cols: List[np.ndarray] = []
+        self._post_tfs: List[np.ndarray] = []
+        self._weights: Optional[sparse.csc_matrix] = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def add(self, items: Iterable[Tuple[str, str]]):
+        with self._lock:
+            for chunk_id, text in items:
+                if chunk_id in self._row_of:
+                    self._tombstone(chunk_id)
+                counts = Counter(tokenize(text))
+                row = len(self._ids)
+                self._ids.append(chunk_id)
+                self._row_of[chunk_id] = row
+                self._lengths.append(sum(counts.values()))
+                if not counts:
+                    continue
+                cols = [self._vocab.setdefault(t, len(self._vocab)) for t in counts]
+                self._post_rows.append(np.full(len(cols), row, dtype=np.int32))
+                self._post_cols.append(np.asarray(cols, dtype=np.int32))
+                self._post_tfs.append(
+                    np.fromiter(counts.values(), dtype=np.float32, count=len(cols))
+                )
+            self._dirty = True
+
+    def remove(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                if chunk_id in self._row_of:
+                    self._tombstone(chunk_id)
+                    self._dirty = True
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        with self._lock:
+            cols = sorted({self._vocab[t] for t in tokenize(query) if t in self._vocab})
+            if not cols or not self._row_of:
+                return []
+            if self._dirty or self._weights is None:
+                self._rebuild()
+            assert self._weights is not None
+            scores = np.asarray(self._weights[:, cols].sum(axis=1)).ravel()
+            ids = list(self._ids)
+
+        top_k = min(top_k, int(np.count_nonzero(scores)))
+        if top_k <= 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i])) for i in top if ids[i] is not None]
+
+    def _tombstone(self, chunk_id: str):
+        row = self._row_of.pop(chunk_id)
+        self._ids[row] = None
+
+    def _rebuild(self):
+        if len(self._row_of) < len(self._ids) // 2:
+            self._compact()
+
+        n_docs, n_terms = len(self._ids), len(self._vocab)
+        if self._post_rows:
+            rows = np.concatenate(self._post_rows)
+            cols = np.concatenate(self._post_cols)
+            tfs = np.concatenate(self._post_tfs)
+        else:
+            rows = cols = np.empty(0, dtype=np.int32)
+            tfs = np.empty(0, dtype=np.float32)
+
+        alive = np.fromiter(
+            (chunk_id is not None for chunk_id in self._ids), dtype=bool, count=n_docs
+        )
+        keep = alive[rows]
+        rows, cols, tfs = rows[keep], cols[keep], tfs[keep]
+
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        avgdl = float(lengths[alive].mean()) if alive.any() else 1.0
+        df = np.bincount(cols, minlength=n_terms).astype(np.float32)
+        n_alive = float(alive.sum())
+        idf = np.log1p((n_alive - df + 0.5) / (df + 0.5))
+
+        norm = self.k1 * (1 - self.b + self.b * lengths[rows] / (avgdl or 1.0))
+        weights = idf[cols] * tfs * (self.k1 + 1) / (tfs + norm)
+        self._weights = sparse.csc_matrix(
+            (weights, (rows, cols)), shape=(n_docs, n_terms), dtype=np.float32
+        )
+        self._dirty = False
+
+    def _compact(self):
+        # drop tombstoned rows so deleted chunks stop costing memory and time
+        rows = np.concatenate(self._post_rows) if self._post_rows else None
+        remap = np.full(len(self._ids), -1, dtype=np.int32)
+        new_ids: List[Optional[str]] = []
+        new_lengths: List[int] = []
+        for old_row, chunk_id in enumerate(self._ids):
+            if chunk_id is None:
+                continue
+            remap[old_row] = len(new_ids)
+            self._row_of[chunk_id] = len(new_ids)
+            new_ids.append(chunk_id)
+            new_lengths.append(self._lengths[old_row])
+
+        if rows is not None:
+            new_rows = remap[rows]
+            keep = new_rows >= 0
+            self._post_rows = [new_rows[keep]]
+            self._post_cols = [np.concatenate(self._post_cols)[keep]]
+            self._post_tfs = [np.concatenate(self._post_tfs)[keep]]
+        self._ids = new_ids
+        self._lengths = new_lengths
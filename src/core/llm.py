@@ -1,24 +1,29 @@
 import json
-import requests
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, AsyncGenerator
+from core.llm_client import LLMError, get_llm_client
 from config.constants import (
     CORRECTNESS_TRESHOLD,
     DEFAULT_RESPONSE_LANGUAGE,
-    OLLAMA_API_URL,
-    LLM_MODEL,
 )
 
+ANSWER_ERROR_PREFIX = "Error generating answer"
 
-def generate_answer(
+
+def _source_label(chunk: Dict[str, Any]) -> str:
+    label = f"{chunk['file_id']}.{chunk['file_ext']}"
+    if chunk.get("page"):
+        label += f", p. {chunk['page']}"
+    return label
+
+
+def build_answer_prompt(
     query: str,
     context_chunks: List[Dict[str, Any]],
     response_language: str = DEFAULT_RESPONSE_LANGUAGE,
 ) -> str:
     context_text = "\n\n".join(
-        [
-            f"[{chunk['file_id']}.{chunk['file_ext']}] {chunk['text']}"
-            for chunk in context_chunks
-        ]
+        [f"[{_source_label(chunk)}] {chunk['text']}" for chunk in context_chunks]
     )
 
     prompt = f"""
@@ -34,17 +39,19 @@ Context:
 Question: {query}
 Answer:
     """
+    return prompt
 
+
+async def generate_answer(
+    query: str,
+    context_chunks: List[Dict[str, Any]],
+    response_language: str = DEFAULT_RESPONSE_LANGUAGE,
+) -> str:
+    prompt = build_answer_prompt(query, context_chunks, response_language)
     try:
-        response = requests.post(
-            OLLAMA_API_URL + "/generate",
-            json={"model": LLM_MODEL, "prompt": prompt, "stream": False},
-        )
-        response.raise_for_status()
-        data = response.json()
-        answer = data.get("response", "").strip()
-    except requests.RequestException as e:
-        answer = f"Error generating answer: {e}"
+        answer = (await get_llm_client().generate(prompt)).strip()
+    except LLMError as e:
+        answer = f"{ANSWER_ERROR_PREFIX}: {e}"
 
     if not answer:
         answer = "The context does not contain information to answer this question"
@@ -52,7 +59,22 @@ Answer:
     return answer
 
 
-def evaluate_open_answer(
+async def stream_answer(
+    query: str,
+    context_chunks: List[Dict[str, Any]],
+    response_language: str = DEFAULT_RESPONSE_LANGUAGE,
+) -> AsyncGenerator[str, None]:
+    prompt = build_answer_prompt(query, context_chunks, response_language)
+    tokens = get_llm_client().stream(prompt)
+    try:
+        async for token in tokens:
+            yield token
+    finally:
+        # close the HTTP stream right away so Ollama stops generating
+        await tokens.aclose()
+
+
+async def evaluate_open_answer(
     question: str,
     reference_answer: str,
     user_answer: str,
@@ -94,29 +116,110 @@ Now grade according to instructions.
 """
 
     try:
-        response = requests.post(
-            OLLAMA_API_URL + "/generate",
-            json={"model": LLM_MODEL, "prompt": prompt, "stream": False},
-        )
-        response.raise_for_status()
-        raw = response.json().get("response", "").strip()
+        raw = (await get_llm_client().generate(prompt)).strip()
 
         try:
             parsed = json.loads(raw)
         except json.JSONDecodeError:
             parsed = {"score": 0, "feedback": raw}
 
-        score = int(parsed.get("score", 0))
-        feedback = parsed.get("feedback", "No feedback.")
-        correct = score >= CORRECTNESS_TRESHOLD
-
-        return {"correct": correct, "score": score, "feedback": feedback}
+        return _grade(parsed)
 
-    except requests.RequestException as e:
+    except LLMError as e:
         return {"correct": False, "score": 0, "feedback": f"Evaluation error: {e}"}
 
 
-def generate_quiz_questions(
+def _grade(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    score = int(parsed.get("score", 0))
+    feedback = parsed.get("feedback", "No feedback.")
+    return {
+        "correct": score >= CORRECTNESS_TRESHOLD,
+        "score": score,
+        "feedback": feedback,
+    }
+
+
+async def evaluate_open_answers(
+    answers: List[Dict[str, str]],
+    response_language: str,
+) -> List[Dict[str, Any]]:
+    """
+    Grades several open-ended answers (dicts with question, reference_answer
+    and user_answer) in one prompt. Falls back to one prompt per answer if
+    the reply isn't a JSON array with one grade per answer.
+    """
+    if len(answers) == 1:
+        a = answers[0]
+        grade = await evaluate_open_answer(
+            a["question"], a["reference_answer"], a["user_answer"], response_language
+        )
+        return [grade]
+
+    print(f"evaluating {len(answers)} user answers in {response_language}")
+
+    items = "\n\n".join(
+        f"""ANSWER {i}
+Question: {a["question"]}
+Reference Answer: {a["reference_answer"]}
+Student Answer: {a["user_answer"]}"""
+        for i, a in enumerate(answers, start=1)
+    )
+
+    prompt = f"""
+You are a fair teacher grading {len(answers)} students' open-ended answers.
+
+For EACH answer, independently:
+1. Compare the student's answer to the reference answer.
+2. Assign a score in this scale:
+   - 0-4: mostly incorrect or irrelevant
+   - 5-7: partially correct or incomplete
+   - 8-10: accurate and complete
+3. Write feedback in {response_language}.
+
+{items}
+
+IMPORTANT:
+- Respond ONLY with a valid JSON array of EXACTLY {len(answers)} objects, in
+  the same order as the answers above.
+- Write all feedback text ONLY in {response_language}.
+
+EXAMPLE OUTPUT for 2 answers:
+[
+  {{"score": 8, "feedback": "La réponse de l'étudiant est complète et précise."}},
+  {{"score": 3, "feedback": "La réponse ne mentionne pas l'étape principale."}}
+]
+
+Now grade according to instructions.
+"""
+
+    try:
+        raw = (await get_llm_client().generate(prompt)).strip()
+        parsed = json.loads(raw)
+        if isinstance(parsed, list) and len(parsed) == len(answers):
+            return [_grade(p) for p in parsed]
+        print(f"Batch grading returned {raw[:200]!r}, grading one by one.")
+    except (ValueError, AttributeError, TypeError) as e:
+        print(f"Batch grading reply not usable ({e}), grading one by one.")
+    except LLMError as e:
+        return [
+            {"correct": False, "score": 0, "feedback": f"Evaluation error: {e}"}
+            for _ in answers
+        ]
+
+    return await asyncio.gather(
+        *(
+            evaluate_open_answer(
+                a["question"],
+                a["reference_answer"],
+                a["user_answer"],
+                response_language,
+            )
+            for a in answers
+        )
+    )
+
+
+async def generate_quiz_questions(
     context_chunks: List[Dict[str, Any]],
     num_questions,
     response_language,
@@ -175,19 +278,14 @@ REMEMBER: Respond only in {response_language}. Output only the JSON array. Do NO
 """
 
     try:
-        response = requests.post(
-            OLLAMA_API_URL + "/generate",
-            json={"model": LLM_MODEL, "prompt": prompt, "stream": False},
-        )
-        response.raise_for_status()
-        raw = response.json().get("response", "").strip()
+        raw = (await get_llm_client().generate(prompt)).strip()
 
         try:
             questions = json.loads(raw)
         except json.JSONDecodeError:
             print(raw)
             questions = []
-    except requests.RequestException as e:
+    except LLMError as e:
         questions = [
             {"type": "error", "question": str(e), "options": None, "answer": ""}
         ]
@@ -0,0 +1,170 @@
+import json
+import asyncio
+from typing import Any, AsyncGenerator, Dict, Optional
+import httpx
+from config.constants import (
+    OLLAMA_API_URL,
+    LLM_MODEL,
+    LLM_TIMEOUT,
+    LLM_CONNECT_TIMEOUT,
+    LLM_RETRIES,
+    LLM_RETRY_BACKOFF,
+    LLM_POOL_SIZE,
+    LLM_MAX_CONCURRENCY_PER_MODEL,
+)
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class OllamaClient:
+    """
+    Async Ollama client: one pooled keep-alive connection pool, timeouts,
+    retries with exponential backoff and a concurrency cap per model.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_API_URL,
+        timeout: float = LLM_TIMEOUT,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        retries: int = LLM_RETRIES,
+        backoff: float = LLM_RETRY_BACKOFF,
+        pool_size: int = LLM_POOL_SIZE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY_PER_MODEL,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.limits = httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size
+        )
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _session(self) -> httpx.AsyncClient:
+        # httpx clients and semaphores are bound to the loop they were first
+        # used on; the CLI and the API each run their own loop
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._discard_client()
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits
+            )
+            self._loop = loop
+            self._semaphores = {}
+        return self._client
+
+    def _discard_client(self):
+        client, loop = self._client, self._loop
+        self._client = None
+        if client is None or loop is None:
+            return
+        if loop.is_running() and not loop.is_closed():
+            # its pool belongs to that loop, so it has to be closed there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        # a finished loop (e.g. an earlier asyncio.run in the CLI) already
+        # tore down its transports; the client only needs to be dropped
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[model]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def generate(
+        self, prompt: str, model: str = LLM_MODEL, **options: Any
+    ) -> str:
+        payload = {"model": model, "prompt": prompt, "stream": False, **options}
+        client = self._session()
+        async with self._semaphore(model):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await client.post("/generate", json=payload)
+                    if response.status_code in _RETRYABLE_STATUS:
+                        raise httpx.HTTPStatusError(
+                            f"Ollama returned {response.status_code}",
+                            request=response.request,
+                            response=response,
+                        )
+                    response.raise_for_status()
+                    try:
+                        return response.json().get("response", "")
+                    except (ValueError, AttributeError) as e:
+                        # e.g. an HTML error page from a proxy in front of Ollama
+                        raise LLMError(f"Unexpected response from Ollama: {e}") from e
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if not self._should_retry(e, attempt):
+                        raise LLMError(str(e)) from e
+                    await asyncio.sleep(self.backoff * 2**attempt)
+        raise LLMError("Ollama request failed.")
+
+    async def stream(
+        self, prompt: str, model: str = LLM_MODEL, **options: Any
+    ) -> AsyncGenerator[str, None]:
+        """
+        Yields response tokens as Ollama produces them. Retries only happen
+        before the first token; closing the iterator closes the connection,
+        which makes Ollama stop generating.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True, **options}
+        client = self._session()
+        async with self._semaphore(model):
+            for attempt in range(self.retries + 1):
+                started = False
+                try:
+                    async with client.stream(
+                        "POST", "/generate", json=payload
+                    ) as response:
+                        if response.status_code >= 400:
+                            await response.aread()
+                            response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            try:
+                                data = json.loads(line)
+                            except ValueError as e:
+                                raise LLMError(
+                                    f"Malformed stream line from Ollama: {e}"
+                                ) from e
+                            if data.get("error"):
+                                raise LLMError(data["error"])
+                            token = data.get("response", "")
+                            if token:
+                                started = True
+                                yield token
+                            if data.get("done"):
+                                return
+                    return
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if started or not self._should_retry(e, attempt):
+                        raise LLMError(str(e)) from e
+                    await asyncio.sleep(self.backoff * 2**attempt)
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= self.retries:
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in _RETRYABLE_STATUS
+        return True
+
+
+_client: Optional[OllamaClient] = None
+
+
+def get_llm_client() -> OllamaClient:
+    global _client
+    if _client is None:
+        _client = OllamaClient()
+    return _client
@@ -1,45 +1,351 @@
+import os
 import fitz
-import whisper
+import hashlib
+import threading
+import multiprocessing
 from pathlib import Path
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageOps
+from core.transcription import get_transcription_service
+from core.db import get_database
+from config.constants import (
+    PDF_WORKERS,
+    PDF_PAGES_PER_TASK,
+    PDF_OCR_DPI,
+    OCR_LANGUAGES,
+    OCR_WORKERS,
+    OCR_MAX_WIDTH,
+    OCR_TILE_HEIGHT,
+    OCR_CACHE_PATH,
+)
 
+# (page number or None, text) - only PDFs have pages
+Section = Tuple[Optional[int], str]
 
-def extract_text(file_path: Path) -> str:
+_TILE_SEARCH = OCR_TILE_HEIGHT // 8
+_MAX_PARAMS = 900
+_TEXT_BLOCK_CHARS = 64 * 1024
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def iter_sections(file_path: Path) -> Iterator[Section]:
+    """
+    Yields the text of a file piece by piece - PDF pages, transcript segments
+    or blocks of lines - so callers never need the whole document in memory.
+    """
     suffix = file_path.suffix.lower()
     if suffix == ".pdf":
-        return _extract_pdf(file_path)
+        yield from _iter_pdf(file_path)
     elif suffix in [".jpg", ".jpeg", ".png"]:
-        return _extract_image(file_path)
+        yield None, _extract_image(file_path)
     elif suffix in [".txt", ".md"]:
-        return file_path.read_text(encoding="utf-8")
+        yield from _iter_text(file_path)
     elif suffix in [".mp3", ".wav", ".mp4"]:
-        return _extract_audio(file_path)
+        for text in get_transcription_service().iter_segments(file_path):
+            yield None, text
     else:
         raise ValueError(f"Unsupported file type: {suffix}")
 
 
-def _extract_pdf(file_path: Path) -> str:
-    text: str = ""
+def extract_sections(file_path: Path) -> List[Section]:
+    return list(iter_sections(file_path))
 
-    with fitz.open(file_path) as pdf:
-        for page in pdf:
-            page_text = page.get_text("text")
-            if not isinstance(page_text, str):
-                page_text = str(page_text)
-            text += page_text + "\n"
 
+def extract_text(file_path: Path) -> str:
+    return "\n".join(text for _, text in iter_sections(file_path)).strip()
+
+
+def _iter_text(file_path: Path) -> Iterator[Section]:
+    with file_path.open(encoding="utf-8") as f:
+        block: List[str] = []
+        size = 0
+        for line in f:
+            block.append(line)
+            size += len(line)
+            if size >= _TEXT_BLOCK_CHARS:
+                yield None, "".join(block)
+                block, size = [], 0
+        if block:
+            yield None, "".join(block)
+
+
+def preprocess_image(img: Image.Image) -> Image.Image:
+    """
+    Upright, grayscale, at most OCR_MAX_WIDTH wide and binarized with an
+    Otsu threshold - Tesseract is both faster and more accurate on that than
+    on a full-resolution colour phone photo.
+    """
+    img = ImageOps.exif_transpose(img).convert("L")
+    if img.width > OCR_MAX_WIDTH:
+        height = max(1, round(img.height * OCR_MAX_WIDTH / img.width))
+        img = img.resize((OCR_MAX_WIDTH, height), Image.Resampling.LANCZOS)
+    img = ImageOps.autocontrast(img)
+    threshold = _otsu_threshold(img.histogram())
+    return img.point([255 if v > threshold else 0 for v in range(256)])
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    total = sum(histogram)
+    sum_all = sum(i * n for i, n in enumerate(histogram))
+    best, best_var = 127, -1.0
+    weight_bg = sum_bg = 0
+    for i, n in enumerate(histogram):
+        weight_bg += n
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * n
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best, best_var = i, var
+    return best
+
+
+def tile_image(img: Image.Image) -> List[Image.Image]:
+    # cut tall images into strips at the whitest row near each boundary so
+    # no text line is sliced in half
+    width, height = img.size
+    if height <= OCR_TILE_HEIGHT:
+        return [img]
+    rows = img.resize((1, height), Image.Resampling.BOX).tobytes()  # mean of each row
+    tiles, top = [], 0
+    while height - top > OCR_TILE_HEIGHT:
+        bottom = top + OCR_TILE_HEIGHT
+        cut = max(range(bottom, bottom - _TILE_SEARCH, -1), key=rows.__getitem__)
+        tiles.append(img.crop((0, top, width, cut)))
+        top = cut
+    tiles.append(img.crop((0, top, width, height)))
+    return tiles
+
+
+def _init_ocr_worker():
+    # one Tesseract per core already; its own OpenMP threads would oversubscribe
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _ocr_tile(img: Image.Image, languages: str) -> str:
+    text: str = pytesseract.image_to_string(img, lang=languages)
     return text.strip()
 
 
+class OcrCache:
+    """OCR output keyed by a hash of the source image, in SQLite."""
+
+    def __init__(self, db_path: str = OCR_CACHE_PATH):
+        self.db_path = db_path
+        self.db = get_database(db_path)
+        self._init_db()
+
+    def _init_db(self):
+        with self.db.transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    image_hash TEXT PRIMARY KEY,
+                    text TEXT
+                )
+                """
+            )
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        conn = self.db.connection()
+        for i in range(0, len(keys), _MAX_PARAMS):
+            batch = keys[i : i + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT image_hash, text FROM ocr_cache WHERE image_hash IN ({placeholders})",
+                batch,
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def put_many(self, items: Dict[str, str]):
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ocr_cache (image_hash, text) VALUES (?, ?)",
+                list(items.items()),
+            )
+
+
+class OcrEngine:
+    """
+    Tesseract over a process pool: images are hashed and looked up in the
+    cache, misses are preprocessed and tiled here and every tile is OCRed
+    in parallel, one Tesseract per worker.
+    """
+
+    def __init__(
+        self,
+        workers: int = OCR_WORKERS,
+        languages: str = OCR_LANGUAGES,
+        cache: Optional[OcrCache] = None,
+    ):
+        self.workers = workers
+        self.languages = languages
+        self.cache = cache or OcrCache()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_ocr_worker,
+                )
+            return self._pool
+
+    def key(self, img: Image.Image) -> str:
+        digest = hashlib.sha1(
+            f"{self.languages}|{img.mode}|{img.width}x{img.height}|".encode("utf-8")
+        )
+        digest.update(img.tobytes())
+        return digest.hexdigest()
+
+    def recognize(self, img: Image.Image) -> str:
+        return self.recognize_many([img])[0]
+
+    def recognize_many(self, images: List[Image.Image]) -> List[str]:
+        keys = [self.key(img) for img in images]
+        found = self.cache.get_many(list(set(keys)))
+
+        pending: Dict[str, List[Image.Image]] = {}
+        for key, img in zip(keys, images):
+            if key not in found and key not in pending:
+                pending[key] = tile_image(preprocess_image(img))
+
+        if pending:
+            texts = self._ocr_tiles([t for tiles in pending.values() for t in tiles])
+            fresh, i = {}, 0
+            for key, tiles in pending.items():
+                fresh[key] = "\n".join(t for t in texts[i : i + len(tiles)] if t)
+                i += len(tiles)
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def _ocr_tiles(self, tiles: List[Image.Image]) -> List[str]:
+        if self.workers <= 1 or len(tiles) == 1:
+            return [_ocr_tile(tile, self.languages) for tile in tiles]
+        pool = self._get_pool()
+        futures = [pool.submit(_ocr_tile, tile, self.languages) for tile in tiles]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+_ocr_engine: Optional[OcrEngine] = None
+_ocr_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OcrEngine:
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            _ocr_engine = OcrEngine()
+        return _ocr_engine
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_pool
+
+
+def _iter_pdf(file_path: Path) -> Iterator[Section]:
+    with fitz.open(file_path) as pdf:
+        page_count = pdf.page_count
+    ranges = [
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+    if len(ranges) <= 1 or PDF_WORKERS <= 1:
+        for start, stop in ranges:
+            yield from _ocr_scans(*_extract_pdf_pages(str(file_path), start, stop))
+        return
+
+    # only a window of page ranges is in flight, so a slow consumer holds
+    # back extraction instead of buffering the whole document
+    pool = _get_pdf_pool()
+    window: Deque[Future] = deque()
+    try:
+        for start, stop in ranges:
+            window.append(pool.submit(_extract_pdf_pages, str(file_path), start, stop))
+            if len(window) >= 2 * PDF_WORKERS:
+                yield from _ocr_scans(*window.popleft().result())
+        while window:
+            yield from _ocr_scans(*window.popleft().result())
+    finally:
+        for future in window:
+            future.cancel()
+
+
+def _ocr_scans(
+    sections: List[Section], scans: List[Tuple[int, Image.Image]]
+) -> List[Section]:
+    if not scans:
+        return sections
+    texts = get_ocr_engine().recognize_many([img for _, img in scans])
+    sections = sections + [
+        (page, text) for (page, _), text in zip(scans, texts) if text
+    ]
+    # PDF sections always carry a page number
+    return sorted(sections, key=lambda section: section[0] or 0)
+
+
+def _extract_pdf_pages(
+    file_path: str, start: int, stop: int
+) -> Tuple[List[Section], List[Tuple[int, Image.Image]]]:
+    # runs in a pool worker; each worker opens its own document handle.
+    # Scanned pages have no text layer, so they come back rendered for OCR.
+    sections: List[Section] = []
+    scans: List[Tuple[int, Image.Image]] = []
+    with fitz.open(file_path) as pdf:
+        for number in range(start, stop):
+            page = pdf[number]
+            text = page.get_text("text")
+            if not isinstance(text, str):
+                text = str(text)
+            if text.strip():
+                sections.append((number + 1, text.strip()))
+            elif page.get_images():
+                pix = page.get_pixmap(dpi=PDF_OCR_DPI, colorspace=fitz.csGRAY)
+                img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+                scans.append((number + 1, img))
+    return sections, scans
+
+
 def _extract_image(file_path: Path) -> str:
-    img: Image.Image = Image.open(file_path)
-    text: str = pytesseract.image_to_string(img, lang="eng+slk")
-    return text.strip()
+    with Image.open(file_path) as img:
+        img.load()
+        return get_ocr_engine().recognize(img)
 
 
 def _extract_audio(file_path: Path) -> str:
-    model = whisper.load_model("base")  # "tiny", "small", etc.
-    result: dict = model.transcribe(str(file_path))
-    text: str = result.get("text", "")
+    text: str = get_transcription_service().transcribe(file_path)
     return text.strip()
@@ -0,0 +1,196 @@
+import uuid
+import json
+import random
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Set
+from core.db import get_database
+from config.constants import SQL3_PATH, QUESTION_BANK_SAMPLE_POOL
+
+# SQLite's default limit on host parameters per statement
+_MAX_PARAMS = 900
+
+# append-only, see Database.migrate()
+MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS question_bank (
+            id TEXT PRIMARY KEY,
+            chunk_id TEXT,
+            file_id TEXT,
+            language TEXT,
+            topic TEXT,
+            type TEXT,
+            question TEXT,
+            options TEXT,
+            answer TEXT,
+            used_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_question_bank_language_used
+        ON question_bank(language, used_count)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_question_bank_chunk
+        ON question_bank(chunk_id, language)
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_question_bank_file ON question_bank(file_id)",
+    ],
+]
+
+
+class QuestionBank:
+    """
+    Questions generated ahead of time from single chunks, tagged with the
+    chunk and file they came from, their topic and language. Quizzes are
+    sampled from here, least-used questions first and spread over as many
+    files and topics as the pool allows.
+    """
+
+    def __init__(self, db_path: str = SQL3_PATH):
+        self.db_path = db_path
+        self.db = get_database(db_path)
+        self.db.migrate("question_bank", MIGRATIONS)
+
+    def add(self, chunk: Dict[str, Any], language: str, questions: List[Dict]):
+        with self.db.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO question_bank
+                    (id, chunk_id, file_id, language, topic, type, question, options, answer)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        uuid.uuid4().hex,
+                        chunk["id"],
+                        chunk["file_id"],
+                        language,
+                        q.get("topic"),
+                        q["type"],
+                        q["question"],
+                        json.dumps(q.get("options")),
+                        q["answer"],
+                    )
+                    for q in questions
+                ],
+            )
+
+    def covered_chunks(self, chunk_ids: Iterable[str], language: str) -> Set[str]:
+        chunk_ids = list(chunk_ids)
+        covered: Set[str] = set()
+        conn = self.db.connection()
+        for i in range(0, len(chunk_ids), _MAX_PARAMS):
+            batch = chunk_ids[i : i + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"""
+                SELECT DISTINCT chunk_id FROM question_bank
+                WHERE language=? AND chunk_id IN ({placeholders})
+                """,
+                [language, *batch],
+            ).fetchall()
+            covered.update(r[0] for r in rows)
+        return covered
+
+    def prune_file(self, file_id: str, keep_chunk_ids: Set[str]) -> int:
+        # drops the questions of chunks that are no longer in the file
+        conn = self.db.connection()
+        stored = {
+            r[0]
+            for r in conn.execute(
+                "SELECT DISTINCT chunk_id FROM question_bank WHERE file_id=?",
+                (file_id,),
+            )
+        }
+        stale = list(stored - keep_chunk_ids)
+        removed = 0
+        with self.db.transaction() as conn:
+            for i in range(0, len(stale), _MAX_PARAMS):
+                batch = stale[i : i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                removed += conn.execute(
+                    f"DELETE FROM question_bank WHERE chunk_id IN ({placeholders})",
+                    batch,
+                ).rowcount
+        return removed
+
+    def count_unused(self, language: str) -> int:
+        conn = self.db.connection()
+        return conn.execute(
+            "SELECT COUNT(*) FROM question_bank WHERE language=? AND used_count=0",
+            (language,),
+        ).fetchone()[0]
+
+    def sample(self, n: int, language: str) -> List[Dict[str, Any]]:
+        """
+        Picks n questions and counts them as used, or none if the bank has
+        fewer. Candidates are the least used ones (random among ties); from
+        those, every round takes one question per file, preferring topics
+        not yet in the quiz.
+        """
+        conn = self.db.connection()
+        rows = conn.execute(
+            """
+            SELECT id, file_id, topic, type, question, options, answer
+            FROM question_bank WHERE language=?
+            ORDER BY used_count, RANDOM() LIMIT ?
+            """,
+            (language, n * QUESTION_BANK_SAMPLE_POOL),
+        ).fetchall()
+
+        by_file: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        for row in rows:
+            by_file.setdefault(row[1], []).append(row)
+        files = list(by_file.values())
+        random.shuffle(files)
+
+        picked: List[tuple] = []
+        topics: Set[str] = set()
+        for fresh_topics_only in (True, False):
+            while len(picked) < n and any(files):
+                took = False
+                for candidates in files:
+                    if len(picked) >= n:
+                        break
+                    for row in candidates:
+                        if not fresh_topics_only or row[2] not in topics:
+                            candidates.remove(row)
+                            picked.append(row)
+                            topics.add(row[2])
+                            took = True
+                            break
+                if not took:
+                    break
+
+        if len(picked) < n:
+            return []
+        if picked:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    "UPDATE question_bank SET used_count = used_count + 1 WHERE id=?",
+                    [(row[0],) for row in picked],
+                )
+        return [
+            {
+                "type": row[3],
+                "question": row[4],
+                "topic": row[2],
+                "options": json.loads(row[5]) if row[5] else None,
+                "answer": row[6],
+            }
+            for row in picked
+        ]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        conn = self.db.connection()
+        rows = conn.execute(
+            """
+            SELECT language, COUNT(*), SUM(used_count = 0)
+            FROM question_bank GROUP BY language
+            """
+        ).fetchall()
+        return {
+            lang: {"questions": total, "unused": unused} for lang, total, unused in rows
+        }
@@ -1,52 +1,225 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from core.quiz.store import QuizStore
 from core.quiz.evaluator import Evaluator
 from core.user.manager import UserManager
+from config.constants import QUIZ_SESSION_CACHE_SIZE, QUIZ_SESSION_TTL
+
+
+class QuizSessionError(Exception):
+    pass
+
+
+class SessionNotFound(QuizSessionError):
+    pass
+
+
+class SessionConflict(QuizSessionError):
+    pass
+
+
+class QuizSubmissionError(Exception):
+    pass
+
+
+class QuizNotFound(QuizSubmissionError):
+    pass
+
+
+class InvalidSubmission(QuizSubmissionError):
+    pass
+
+
+class AlreadySubmitted(QuizSubmissionError):
+    pass
+
+
+class SessionCache:
+    """
+    In-memory LRU of quiz sessions with TTL eviction, in front of the
+    quiz_sessions table. The table is the source of truth: a stale entry
+    (e.g. another worker moved the session on) is caught by the optimistic
+    position check when the answer is recorded.
+    """
+
+    def __init__(
+        self, max_items: int = QUIZ_SESSION_CACHE_SIZE, ttl: float = QUIZ_SESSION_TTL
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return dict(entry[1])
+
+    def put(self, session: Dict[str, Any]):
+        with self._lock:
+            self._entries[session["session_id"]] = (time.time(), dict(session))
+            self._entries.move_to_end(session["session_id"])
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def pop(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
 
 
 class QuizEngine:
     def __init__(
-        self, store: QuizStore, evaluator: Evaluator, user_manager: UserManager
+        self,
+        store: QuizStore,
+        evaluator: Evaluator,
+        user_manager: UserManager,
+        sessions: Optional[SessionCache] = None,
     ):
         self.store = store
         self.evaluator = evaluator
         self.user_manager = user_manager
+        self.sessions = sessions or SessionCache()
 
     def start(self, user_id, quiz_id):
-        self.offset = 0
-        self.user_id = user_id
-        self.quiz_id = quiz_id
-        self.summary = {"score": 0}
-        return self.store.get_question(quiz_id, self.offset)
-
-    def answer(self, question_id: str, user_answer: str):
-        correct, feedback, score = self.evaluator.evaluate(
-            self.quiz_id, question_id, user_answer
-        )
+        first = self.store.get_question(quiz_id, 0)
+        if not first:
+            return None
+        session = self.store.create_session(quiz_id, user_id)
+        self.sessions.put(session)
+        return {"session_id": session["session_id"], **first}
+
+    def get_session(self, session_id: str, refresh: bool = False) -> Dict[str, Any]:
+        session = None if refresh else self.sessions.get(session_id)
+        if session is None:
+            session = self.store.get_session(session_id)
+            if session is None:
+                raise SessionNotFound(f"Unknown quiz session {session_id}")
+            self.sessions.put(session)
+        return session
 
-        with self.store._connect() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT topic FROM questions WHERE id=?", (question_id,))
-            row = cur.fetchone()
-            topic = row[0] if row else "Unknown"
-
-        self.store.save_result(
-            quiz_id=self.quiz_id,
-            question_id=question_id,
-            user_id=self.user_id,
-            user_answer=user_answer,
-            correct=correct,
-            score=score,
+    async def answer(
+        self,
+        session_id: str,
+        question_id: str,
+        user_answer: str,
+        user_id: Optional[str] = None,
+        quiz_id: Optional[str] = None,
+    ):
+        session = self.get_session(session_id)
+        if (user_id and user_id != session["user_id"]) or (
+            quiz_id and quiz_id != session["quiz_id"]
+        ):
+            raise SessionConflict("Quiz or user does not match the session.")
+
+        current = self.store.get_question(session["quiz_id"], session["position"])
+        if not current or current["id"] != question_id:
+            # the cached position may be behind another worker's
+            session = self.get_session(session_id, refresh=True)
+            current = self.store.get_question(session["quiz_id"], session["position"])
+            if not current or current["id"] != question_id:
+                raise SessionConflict(
+                    f"Question {question_id} is not the current question of this session."
+                )
+
+        correct, feedback, score = await self.evaluator.evaluate(
+            session["quiz_id"], question_id, user_answer
         )
 
-        self.user_manager.update_topic_performance(self.user_id, topic, correct)
+        topic = self.store.get_question_topic(question_id)
+        # the result, the session position and the topic stats move together
+        with self.store.db.transaction():
+            if not self.store.record_answer(
+                session, question_id, user_answer, correct, score
+            ):
+                self.sessions.pop(session_id)
+                raise SessionConflict(f"Question {question_id} was already answered.")
+            self.user_manager.update_topic_performance(
+                session["user_id"], topic, correct
+            )
 
-        self.summary["score"] += score
-        self.offset += 1
-        next_q = self.store.get_question(self.quiz_id, self.offset)
+        session["position"] += 1
+        session["correct"] += int(correct)
+        session["score"] += score
+        self.sessions.put(session)
 
+        result = {"correct": correct, "feedback": feedback, "score": score}
+        next_q = self.store.get_question(session["quiz_id"], session["position"])
         if not next_q:
-            summary = self.store.get_summary(self.quiz_id)
-            summary["score"] = self.summary["score"]
-            return {"feedback": feedback, "next": None, "summary": summary}
+            summary = {
+                "total": session["position"],
+                "correct": session["correct"],
+                "score": session["score"],
+            }
+            return {**result, "next": None, "summary": summary}
+
+        return {**result, "next": next_q}
+
+    async def submit(self, user_id: str, quiz_id: str, answers: List[Tuple[str, str]]):
+        """
+        Grades a whole quiz at once from (question_id, user_answer) pairs and
+        stores the results and topic stats in a single transaction. A user
+        gets one submission per quiz, and none once they have answered any
+        of its questions in a session; sessions still open on the quiz are
+        closed by it.
+        """
+        answer_keys = self.store.get_answer_keys(quiz_id)
+        if not answer_keys:
+            raise QuizNotFound(f"Unknown quiz {quiz_id}")
+        seen = set()
+        for question_id, _ in answers:
+            if question_id not in answer_keys:
+                raise InvalidSubmission(
+                    f"Question {question_id} is not part of quiz {quiz_id}."
+                )
+            if question_id in seen:
+                raise InvalidSubmission(f"Question {question_id} was answered twice.")
+            seen.add(question_id)
+        already = f"Quiz {quiz_id} was already answered by {user_id}."
+        if self.store.has_results(quiz_id, user_id):
+            raise AlreadySubmitted(already)
+
+        grades = await self.evaluator.evaluate_many(answer_keys, answers)
+
+        with self.store.db.transaction():
+            # checked again under the write lock, grading took a while
+            if self.store.has_results(quiz_id, user_id):
+                raise AlreadySubmitted(already)
+            self.store.close_sessions(quiz_id, user_id, len(answer_keys))
+            self.store.save_results(
+                quiz_id,
+                user_id,
+                [
+                    (question_id, user_answer, correct, score)
+                    for (question_id, user_answer), (correct, _, score) in zip(
+                        answers, grades
+                    )
+                ],
+            )
+            for (question_id, _), (correct, _, _) in zip(answers, grades):
+                self.user_manager.update_topic_performance(
+                    user_id, answer_keys[question_id][4], correct
+                )
 
-        return {"feedback": feedback, "next": next_q}
+        results = [
+            {
+                "question_id": question_id,
+                "correct": correct,
+                "feedback": feedback,
+                "score": score,
+            }
+            for (question_id, _), (correct, feedback, score) in zip(answers, grades)
+        ]
+        summary = {
+            "total": len(results),
+            "correct": sum(int(r["correct"]) for r in results),
+            "score": sum(r["score"] for r in results),
+        }
+        return {"results": results, "summary": summary}
@@ -1,36 +1,202 @@
-from config.constants import DEFAULT_RESPONSE_LANGUAGE
-from core.llm import evaluate_open_answer
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.constants import (
+    DEFAULT_RESPONSE_LANGUAGE,
+    QUIZ_GRADING_CONCURRENCY,
+    QUIZ_GRADING_BATCH_SIZE,
+    GRADING_ACCEPT_SIMILARITY,
+    GRADING_ACCEPT_OVERLAP,
+    GRADING_REJECT_SIMILARITY,
+    GRADING_REJECT_OVERLAP,
+)
+from core.embeddings import EmbeddingManager, PRIORITY_QUERY
+from core.lexical_index import tokenize
+from core.llm import evaluate_open_answer, evaluate_open_answers
 from core.quiz.store import QuizStore
 
+# (correct, feedback, score)
+Grade = Tuple[bool, str, float]
+
+
+def _grade_choice(correct_answer: str, user_answer: str) -> Grade:
+    is_correct = user_answer.strip().lower() == correct_answer.strip().lower()
+    feedback = "Correct!" if is_correct else f"Wrong. Correct answer: {correct_answer}"
+    score = 1 if is_correct else 0
+    return is_correct, feedback, score
+
+
+def word_overlap(reference: str, answer: str) -> float:
+    # share of the reference's distinct words that the answer contains
+    ref_words = set(tokenize(reference))
+    if not ref_words:
+        return 0.0
+    return len(ref_words & set(tokenize(answer))) / len(ref_words)
+
 
 class Evaluator:
-    def __init__(self, store: QuizStore):
+    """
+    Grades quiz answers. Multiple-choice answers are compared directly.
+    Open-ended ones go through a cheap first tier (embedding cosine to the
+    reference answer plus word overlap) that settles the clear cases
+    locally; only the band in between is sent to the LLM.
+    """
+
+    def __init__(
+        self,
+        store: QuizStore,
+        embedder: Optional[EmbeddingManager] = None,
+        concurrency: int = QUIZ_GRADING_CONCURRENCY,
+        batch_size: int = QUIZ_GRADING_BATCH_SIZE,
+        accept_similarity: float = GRADING_ACCEPT_SIMILARITY,
+        accept_overlap: float = GRADING_ACCEPT_OVERLAP,
+        reject_similarity: float = GRADING_REJECT_SIMILARITY,
+        reject_overlap: float = GRADING_REJECT_OVERLAP,
+    ):
         self.store = store
+        self.embedder = embedder
+        self.concurrency = concurrency
+        self.batch_size = max(1, batch_size)
+        self.accept_similarity = accept_similarity
+        self.accept_overlap = accept_overlap
+        self.reject_similarity = reject_similarity
+        self.reject_overlap = reject_overlap
+        self._lock = threading.Lock()
+        self._counts = {"accepted": 0, "rejected": 0, "escalated": 0}
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        local = counts["accepted"] + counts["rejected"]
+        return {
+            **counts,
+            "local_rate": round(local / total, 4) if total else 0.0,
+        }
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counts[name] += n
+
+    async def _triage(self, pairs: List[Tuple[str, str]]) -> List[Optional[Grade]]:
+        """
+        First tier for (reference_answer, user_answer) pairs: a local grade
+        for the confident cases, None for the ones the LLM has to decide.
+        """
+        grades: List[Optional[Grade]] = [None] * len(pairs)
+        pending = []
+        embedder = self.embedder
+        for i, (reference, answer) in enumerate(pairs):
+            if not tokenize(answer):
+                grades[i] = (False, f"No answer. Correct answer: {reference}", 0)
+            elif embedder is not None:
+                pending.append(i)
+
+        if pending and embedder is not None:
+            references = [pairs[i][0] for i in pending]
+            answers = [pairs[i][1] for i in pending]
+
+            def encode():
+                # reference answers are few and reused; student answers are
+                # free text and stay out of the embedding cache
+                return (
+                    embedder.encode(references, PRIORITY_QUERY),
+                    embedder.encode(answers, PRIORITY_QUERY, store=False),
+                )
 
-    def evaluate(self, quiz_id, question_id, user_answer):
-        with self.store._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT question, type, options, answer
-                FROM questions WHERE id=? AND quiz_id=?
-            """,
-                (question_id, quiz_id),
+            ref_vectors, answer_vectors = await asyncio.to_thread(encode)
+            ref_vectors, answer_vectors = (
+                v / np.clip(np.linalg.norm(v, axis=1, keepdims=True), 1e-9, None)
+                for v in (ref_vectors, answer_vectors)
             )
-            q = cur.fetchone()
-            if not q:
-                return False, "Question not found", 0
+            cosines = (ref_vectors * answer_vectors).sum(axis=1)
+            for i, cosine in zip(pending, cosines):
+                reference, answer = pairs[i]
+                overlap = word_overlap(reference, answer)
+                score = int(round(float(np.clip(cosine, 0, 1)) * 10))
+                if cosine >= self.accept_similarity and overlap >= self.accept_overlap:
+                    grades[i] = (True, "Correct!", score)
+                elif cosine < self.reject_similarity and overlap < self.reject_overlap:
+                    grades[i] = (False, f"Wrong. Correct answer: {reference}", score)
+
+        accepted = sum(1 for g in grades if g is not None and g[0])
+        self._count("accepted", accepted)
+        self._count("rejected", sum(1 for g in grades if g is not None) - accepted)
+        self._count("escalated", sum(1 for g in grades if g is None))
+        return grades
+
+    async def evaluate(self, quiz_id, question_id, user_answer):
+        q = self.store.get_answer_key(quiz_id, question_id)
+        if not q:
+            return False, "Question not found", 0
 
         q_type, correct_answer = q[1], q[3]
 
         if q_type == "multiple_choice":
-            is_correct = user_answer.strip().lower() == correct_answer.strip().lower()
-            feedback = (
-                "Correct!" if is_correct else f"Wrong. Correct answer: {correct_answer}"
-            )
-            score = 1 if is_correct else 0
-            return is_correct, feedback, score
+            return _grade_choice(correct_answer, user_answer)
+
+        local = (await self._triage([(correct_answer, user_answer)]))[0]
+        if local is not None:
+            return local
 
         # Open-ended → LLM is used for semantic comparison
-        eval_result = evaluate_open_answer(q[0], correct_answer, user_answer, DEFAULT_RESPONSE_LANGUAGE)
+        eval_result = await evaluate_open_answer(
+            q[0], correct_answer, user_answer, DEFAULT_RESPONSE_LANGUAGE
+        )
         return eval_result["correct"], eval_result["feedback"], eval_result["score"]
+
+    async def evaluate_many(
+        self, answer_keys: Dict[str, tuple], answers: List[Tuple[str, str]]
+    ) -> List[Grade]:
+        """
+        Grades (question_id, user_answer) pairs against answer_keys as
+        returned by QuizStore.get_answer_keys(). Multiple-choice answers are
+        graded right away, open-ended ones by the local tier where it is
+        confident. The rest are grouped batch_size per prompt and the prompts
+        run concurrently, at most `concurrency` at a time.
+        """
+        grades: List[Optional[Grade]] = [None] * len(answers)
+        open_ended = []
+        for i, (question_id, user_answer) in enumerate(answers):
+            question, q_type, _, correct_answer, _ = answer_keys[question_id]
+            if q_type == "multiple_choice":
+                grades[i] = _grade_choice(correct_answer, user_answer)
+            else:
+                open_ended.append(
+                    (
+                        i,
+                        {
+                            "question": question,
+                            "reference_answer": correct_answer,
+                            "user_answer": user_answer,
+                        },
+                    )
+                )
+
+        local = await self._triage(
+            [(item["reference_answer"], item["user_answer"]) for _, item in open_ended]
+        )
+        for (i, _), grade in zip(open_ended, local):
+            grades[i] = grade
+        open_ended = [entry for entry, grade in zip(open_ended, local) if grade is None]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def grade_batch(batch):
+            async with semaphore:
+                results = await evaluate_open_answers(
+                    [item for _, item in batch], DEFAULT_RESPONSE_LANGUAGE
+                )
+            for (i, _), r in zip(batch, results):
+                grades[i] = (r["correct"], r["feedback"], r["score"])
+
+        await asyncio.gather(
+            *(
+                grade_batch(open_ended[start : start + self.batch_size])
+                for start in range(0, len(open_ended), self.batch_size)
+            )
+        )
+        graded = [g for g in grades if g is not None]
+        assert len(graded) == len(answers), "every answer gets a grade"
+        return graded
@@ -1,27 +1,189 @@
 import uuid
+import random
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
 from core.llm import generate_quiz_questions
-from core.retriever import Retriever
+from core.context import ContextBuilder
+from core.embeddings import EmbeddingManager
+from core.quiz.bank import QuestionBank
 from core.quiz.store import QuizStore
-from config.constants import NUMBER_OF_QUIZ_CHUNKS
+from config.constants import (
+    NUMBER_OF_QUIZ_CHUNKS,
+    QUIZ_CONTEXT_TOKEN_BUDGET,
+    QUESTION_BANK_LANGUAGES,
+    QUESTION_BANK_QUESTIONS_PER_CHUNK,
+    QUESTION_BANK_LOW_WATERMARK,
+    QUESTION_BANK_REFILL_CHUNKS,
+)
+
+QUESTION_TYPES = ("multiple_choice", "open_ended")
+
+# ("file", file_id, "") or ("refill", "", language)
+BankJob = Tuple[str, str, str]
+
+
+def _valid_question(q: Any) -> bool:
+    return (
+        isinstance(q, dict)
+        and q.get("type") in QUESTION_TYPES
+        and bool(q.get("question"))
+        and bool(q.get("answer"))
+    )
 
 
 class QuizGenerator:
-    def __init__(self, retriever: Retriever, store: QuizStore):
-        self.retriever = retriever
+    """
+    Creates quizzes from the question bank, which a background task fills
+    chunk by chunk: for every file the registry reports as (re)ingested or
+    removed, and whenever a language runs low on unused questions. Only
+    when the bank can't cover a quiz yet is it generated live, as before.
+    """
+
+    def __init__(
+        self,
+        context_builder: ContextBuilder,
+        store: QuizStore,
+        bank: QuestionBank,
+        embedder: EmbeddingManager,
+    ):
+        self.context_builder = context_builder
         self.store = store
+        self.bank = bank
+        self.embedder = embedder
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[BankJob] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        # covers chunks ingested before the bank (or this language) existed
+        for language in QUESTION_BANK_LANGUAGES:
+            self._schedule(("refill", "", language))
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def on_file_changed(self, file_id: str):
+        # FileRegistry listener
+        self._schedule(("file", file_id, ""))
+
+    def _schedule(self, job: BankJob):
+        if self._queue is None or job in self._pending:
+            return
+        self._pending.add(job)
+        self._queue.put_nowait(job)
+
+    async def _run(self):
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            self._pending.discard(job)
+            kind, file_id, language = job
+            try:
+                if kind == "file":
+                    await self._fill_file(file_id)
+                else:
+                    await self._refill(language)
+            except Exception as e:
+                print(f"Question bank job {job} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _load_chunks(self, ids: List[str]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        found = self.embedder.get_chunks(ids)
+        return [
+            {**meta, "id": chunk_id, "text": doc}
+            for chunk_id, doc, meta in zip(
+                found["ids"], found["documents"], found["metadatas"]
+            )
+        ]
+
+    async def _fill_file(self, file_id: str):
+        current = await asyncio.to_thread(self.embedder.get_file_chunk_ids, file_id)
+        removed = await asyncio.to_thread(self.bank.prune_file, file_id, current)
+        if removed:
+            print(f"Dropped {removed} bank questions of changed chunks in {file_id}.")
+        for language in QUESTION_BANK_LANGUAGES:
+            covered = await asyncio.to_thread(
+                self.bank.covered_chunks, current, language
+            )
+            missing = current - covered
+            await self._generate(sorted(missing), language)
+
+    async def _refill(self, language: str):
+        unused = await asyncio.to_thread(self.bank.count_unused, language)
+        if unused >= QUESTION_BANK_LOW_WATERMARK:
+            return
+        ids = await asyncio.to_thread(self.embedder.get_chunk_ids)
+        covered = await asyncio.to_thread(self.bank.covered_chunks, ids, language)
+        uncovered = list(set(ids) - covered)
+        # once every chunk has questions, more come from random chunks
+        pool = uncovered or ids
+        await self._generate(
+            random.sample(pool, min(QUESTION_BANK_REFILL_CHUNKS, len(pool))), language
+        )
+
+    async def _generate(self, chunk_ids: List[str], language: str):
+        chunks = await asyncio.to_thread(self._load_chunks, chunk_ids)
+        added = 0
+        # one chunk at a time, leaving LLM capacity for interactive requests
+        for chunk in chunks:
+            questions = await generate_quiz_questions(
+                [chunk],
+                num_questions=QUESTION_BANK_QUESTIONS_PER_CHUNK,
+                response_language=language,
+            )
+            questions = [q for q in questions if _valid_question(q)]
+            if questions:
+                await asyncio.to_thread(self.bank.add, chunk, language, questions)
+                added += len(questions)
+        if chunks:
+            print(
+                f"Added {added} {language} questions from {len(chunks)} chunks to the bank."
+            )
+
+    async def _from_bank(
+        self, num_questions: int, language: str
+    ) -> List[Dict[str, Any]]:
+        questions = await asyncio.to_thread(self.bank.sample, num_questions, language)
+        unused = await asyncio.to_thread(self.bank.count_unused, language)
+        if unused < QUESTION_BANK_LOW_WATERMARK:
+            self._schedule(("refill", "", language))
+        return questions
 
     async def generate_general(
         self,
         num_questions: int,
         response_language: str,
     ):
-        chunks = self.retriever.retrieve(query="", top_k=NUMBER_OF_QUIZ_CHUNKS)
+        llm_response = await self._from_bank(num_questions, response_language)
+        if len(llm_response) < num_questions:
+            print("Question bank can't cover this quiz yet, generating it live.")
+            # retrieval, re-ranking and packing block; keep them off the loop
+            chunks = await asyncio.to_thread(
+                self.context_builder.build,
+                query="",
+                top_k=NUMBER_OF_QUIZ_CHUNKS,
+                token_budget=QUIZ_CONTEXT_TOKEN_BUDGET,
+            )
 
-        llm_response = generate_quiz_questions(
-            chunks, num_questions=num_questions, response_language=response_language
-        )
+            llm_response = await generate_quiz_questions(
+                chunks, num_questions=num_questions, response_language=response_language
+            )
 
-        print(f"Generated quiz questions by LLM are: {llm_response}")
+            print(f"Generated quiz questions by LLM are: {llm_response}")
 
         questions = []
         for q in llm_response:
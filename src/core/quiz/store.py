@@ -1,67 +1,104 @@
 import uuid
 import json
-import sqlite3
+from typing import Any, Dict, List, Optional
+from core.db import MigrationStep, add_column, get_database
 from config.constants import SQL3_PATH
 
+# append-only, see Database.migrate()
+MIGRATIONS: List[List[MigrationStep]] = [
+    [
+        # results tables from before users existed have no user_id
+        add_column("results", "user_id", "TEXT"),
+        "CREATE INDEX IF NOT EXISTS idx_questions_quiz ON questions(quiz_id)",
+        "CREATE INDEX IF NOT EXISTS idx_results_quiz ON results(quiz_id)",
+        "CREATE INDEX IF NOT EXISTS idx_results_user ON results(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_quiz_sessions_user ON quiz_sessions(user_id)",
+    ],
+    [
+        # explicit question order; existing quizzes keep their insertion order
+        "ALTER TABLE questions ADD COLUMN position INTEGER",
+        """
+        UPDATE questions SET position = (
+            SELECT COUNT(*) FROM questions q
+            WHERE q.quiz_id = questions.quiz_id AND q.rowid < questions.rowid
+        )
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_quiz_position
+        ON questions(quiz_id, position)
+        """,
+        "DROP INDEX IF EXISTS idx_questions_quiz",
+    ],
+]
+
 
 class QuizStore:
     def __init__(self, db_path: str = SQL3_PATH):
         self.db_path = db_path
+        self.db = get_database(db_path)
         self._init_db()
 
-    def _connect(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA foreign_keys = ON;")
-        return conn
-
     def _init_db(self):
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.executescript(
-                """
-            CREATE TABLE IF NOT EXISTS quizzes (
-                quiz_id TEXT PRIMARY KEY,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            CREATE TABLE IF NOT EXISTS questions (
-                id TEXT PRIMARY KEY,
-                quiz_id TEXT,
-                question TEXT,
-                type TEXT,
-                options TEXT,
-                answer TEXT,
-                topic TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                quiz_id TEXT,
-                question_id TEXT,
-                user_id TEXT,
-                user_answer TEXT,
-                correct INTEGER,
-                score REAL,
-                FOREIGN KEY(user_id) REFERENCES users(user_id)
-            );
+        conn = self.db.connection()
+        cur = conn.cursor()
+        cur.executescript(
             """
-            )
-            conn.commit()
+        CREATE TABLE IF NOT EXISTS quizzes (
+            quiz_id TEXT PRIMARY KEY,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS questions (
+            id TEXT PRIMARY KEY,
+            quiz_id TEXT,
+            question TEXT,
+            type TEXT,
+            options TEXT,
+            answer TEXT,
+            topic TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            quiz_id TEXT,
+            question_id TEXT,
+            user_id TEXT,
+            user_answer TEXT,
+            correct INTEGER,
+            score REAL,
+            FOREIGN KEY(user_id) REFERENCES users(user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS quiz_sessions (
+            session_id TEXT PRIMARY KEY,
+            quiz_id TEXT,
+            user_id TEXT,
+            position INTEGER DEFAULT 0,
+            correct INTEGER DEFAULT 0,
+            score REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+        )
+        self.db.migrate("quiz", MIGRATIONS)
 
     def create_quiz(self, questions):
         quiz_id = f"quiz_{uuid.uuid4().hex[:8]}"
-        with self._connect() as conn:
+        with self.db.transaction() as conn:
             cur = conn.cursor()
             cur.execute("INSERT INTO quizzes (quiz_id) VALUES (?)", (quiz_id,))
-            for q in questions:
+            for position, q in enumerate(questions):
                 cur.execute(
                     """
-                    INSERT INTO questions (id, quiz_id, question, type, options, answer, topic)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO questions
+                        (id, quiz_id, position, question, type, options, answer, topic)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """,
                     (
                         q["id"],
                         quiz_id,
+                        position,
                         q["question"],
                         q["type"],
                         json.dumps(q.get("options")),
@@ -69,31 +106,71 @@ class QuizStore:
                         q.get("topic"),
                     ),
                 )
-            conn.commit()
         return quiz_id
 
-    def get_question(self, quiz_id, offset):
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT id, question, type, options FROM questions
-                WHERE quiz_id=? LIMIT 1 OFFSET ?
+    @staticmethod
+    def _question(row):
+        return {
+            "id": row[0],
+            "question": row[1],
+            "type": row[2],
+            "options": json.loads(row[3]) if row[3] else None,
+        }
+
+    def get_question(self, quiz_id, position):
+        conn = self.db.connection()
+        row = conn.execute(
+            """
+            SELECT id, question, type, options FROM questions
+            WHERE quiz_id=? AND position=?
             """,
-                (quiz_id, offset),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "question": row[1],
-                "type": row[2],
-                "options": json.loads(row[3]) if row[3] else None,
-            }
+            (quiz_id, position),
+        ).fetchone()
+        return self._question(row) if row else None
+
+    def get_quiz_questions(self, quiz_id):
+        # the whole quiz in order, without answers
+        conn = self.db.connection()
+        rows = conn.execute(
+            """
+            SELECT id, question, type, options FROM questions
+            WHERE quiz_id=? ORDER BY position
+            """,
+            (quiz_id,),
+        ).fetchall()
+        return [self._question(row) for row in rows]
+
+    def get_answer_key(self, quiz_id, question_id):
+        conn = self.db.connection()
+        return conn.execute(
+            """
+            SELECT question, type, options, answer
+            FROM questions WHERE id=? AND quiz_id=?
+            """,
+            (question_id, quiz_id),
+        ).fetchone()
+
+    def get_answer_keys(self, quiz_id):
+        # question_id -> (question, type, options, answer, topic)
+        conn = self.db.connection()
+        rows = conn.execute(
+            """
+            SELECT id, question, type, options, answer, topic
+            FROM questions WHERE quiz_id=? ORDER BY position
+            """,
+            (quiz_id,),
+        ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def get_question_topic(self, question_id):
+        conn = self.db.connection()
+        row = conn.execute(
+            "SELECT topic FROM questions WHERE id=?", (question_id,)
+        ).fetchone()
+        return row[0] if row else "Unknown"
 
     def save_result(self, quiz_id, question_id, user_id, user_answer, correct, score):
-        with self._connect() as conn:
+        with self.db.transaction() as conn:
             cur = conn.cursor()
             cur.execute(
                 """
@@ -102,16 +179,123 @@ class QuizStore:
                 """,
                 (quiz_id, question_id, user_id, user_answer, int(correct), score),
             )
-            conn.commit()
+
+    def save_results(self, quiz_id, user_id, results):
+        # results: (question_id, user_answer, correct, score) tuples
+        with self.db.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO results (quiz_id, question_id, user_id, user_answer, correct, score)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (quiz_id, question_id, user_id, user_answer, int(correct), score)
+                    for question_id, user_answer, correct, score in results
+                ],
+            )
+
+    def has_results(self, quiz_id, user_id):
+        conn = self.db.connection()
+        row = conn.execute(
+            "SELECT 1 FROM results WHERE quiz_id=? AND user_id=? LIMIT 1",
+            (quiz_id, user_id),
+        ).fetchone()
+        return row is not None
+
+    def close_sessions(self, quiz_id, user_id, total):
+        # moves open sessions past the last question, so their pending
+        # answers fail the position check in record_answer()
+        with self.db.transaction() as conn:
+            conn.execute(
+                """
+                UPDATE quiz_sessions
+                SET position = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE quiz_id=? AND user_id=? AND position < ?
+                """,
+                (total, quiz_id, user_id, total),
+            )
 
     def get_summary(self, quiz_id):
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
+        conn = self.db.connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT COUNT(*), SUM(correct) FROM results WHERE quiz_id=?
+        """,
+            (quiz_id,),
+        )
+        total, correct = cur.fetchone()
+        return {"total": total or 0, "correct": correct or 0}
+
+    def create_session(self, quiz_id, user_id):
+        session_id = f"session_{uuid.uuid4().hex}"
+        with self.db.transaction() as conn:
+            conn.execute(
                 """
-                SELECT COUNT(*), SUM(correct) FROM results WHERE quiz_id=?
+                INSERT INTO quiz_sessions (session_id, quiz_id, user_id)
+                VALUES (?, ?, ?)
+                """,
+                (session_id, quiz_id, user_id),
+            )
+        return {
+            "session_id": session_id,
+            "quiz_id": quiz_id,
+            "user_id": user_id,
+            "position": 0,
+            "correct": 0,
+            "score": 0.0,
+        }
+
+    def get_session(self, session_id) -> Optional[Dict[str, Any]]:
+        conn = self.db.connection()
+        row = conn.execute(
+            """
+            SELECT session_id, quiz_id, user_id, position, correct, score
+            FROM quiz_sessions WHERE session_id=?
             """,
-                (quiz_id,),
+            (session_id,),
+        ).fetchone()
+        if not row:
+            return None
+        return dict(
+            zip(
+                ("session_id", "quiz_id", "user_id", "position", "correct", "score"),
+                row,
+            )
+        )
+
+    def record_answer(self, session, question_id, user_answer, correct, score):
+        """
+        Moves the session past its current question and stores the result, but
+        only if nobody else has done so since `session` was read (optimistic
+        check on the position). Returns False when it lost that race.
+        """
+        with self.db.transaction() as conn:
+            cur = conn.execute(
+                """
+                UPDATE quiz_sessions
+                SET position = position + 1,
+                    correct = correct + ?,
+                    score = score + ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE session_id=? AND position=?
+                """,
+                (int(correct), score, session["session_id"], session["position"]),
+            )
+            if cur.rowcount != 1:
+                return False
+            conn.execute(
+                """
+                INSERT INTO results (quiz_id, question_id, user_id, user_answer, correct, score)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    session["quiz_id"],
+                    question_id,
+                    session["user_id"],
+                    user_answer,
+                    int(correct),
+                    score,
+                ),
             )
-            total, correct = cur.fetchone()
-            return {"total": total or 0, "correct": correct or 0}
+        return True
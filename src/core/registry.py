@@ -1,18 +1,38 @@
-import sqlite3, hashlib, time
+import hashlib, os, time
 from pathlib import Path
-from config.constants import SQL3_PATH
+from typing import Callable, Dict, List, Optional, Tuple
+from core.db import get_database
+from config.constants import SQL3_PATH, HASH_BLOCK_SIZE
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# (hash, modified_at, size, inode) as stored in the files table
+StoredState = Tuple[Optional[str], Optional[float], Optional[int], Optional[int]]
+
+# SQLite's default limit on host parameters per statement
+_MAX_PARAMS = 900
 
 
 class FileRegistry:
     def __init__(self, db_path: str = SQL3_PATH):
         self.db_path = db_path
+        self.db = get_database(db_path)
+        self._listeners: List[Callable[[str], None]] = []
         self._init_db()
 
-    def _connect(self):
-        return sqlite3.connect(self.db_path)
+    def add_listener(self, callback: Callable[[str], None]):
+        # called with the file_id whenever a file is re-ingested or removed
+        self._listeners.append(callback)
+
+    def _notify(self, file_id: str):
+        for callback in self._listeners:
+            callback(file_id)
 
     def _init_db(self):
-        with self._connect() as conn:
+        with self.db.transaction() as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS files (
@@ -22,47 +42,123 @@ class FileRegistry:
                     hash TEXT,
                     modified_at REAL,
                     chunk_count INTEGER,
-                    processed_at REAL
+                    processed_at REAL,
+                    size INTEGER,
+                    inode INTEGER
                 )
                 """
             )
-            conn.commit()
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+            for column in ("size", "inode"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE files ADD COLUMN {column} INTEGER")
 
     def compute_hash(self, file_path: Path) -> str:
-        return hashlib.sha256(file_path.read_bytes()).hexdigest()
+        if xxhash is not None:
+            hasher, prefix = xxhash.xxh3_128(), "xxh3:"
+        else:
+            hasher, prefix = hashlib.sha256(), ""
+        with open(file_path, "rb") as f:
+            while block := f.read(HASH_BLOCK_SIZE):
+                hasher.update(block)
+        return prefix + hasher.hexdigest()
 
-    def has_changed(self, file_path: Path) -> bool:
-        file_id = file_path.stem
-        with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT hash, modified_at FROM files WHERE file_id=?", (file_id,)
-            )
-            row = cur.fetchone()
-        if not row:
-            return True  # new file
+    def fetch_states(self, file_ids: List[str]) -> Dict[str, StoredState]:
+        states: Dict[str, StoredState] = {}
+        conn = self.db.connection()
+        for i in range(0, len(file_ids), _MAX_PARAMS):
+            batch = file_ids[i : i + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"""
+                SELECT file_id, hash, modified_at, size, inode
+                FROM files WHERE file_id IN ({placeholders})
+                """,
+                batch,
+            ).fetchall()
+            for file_id, *state in rows:
+                states[file_id] = tuple(state)
+        return states
+
+    def check(
+        self, file_path: Path, stored: Optional[StoredState]
+    ) -> Tuple[bool, Optional[str], os.stat_result]:
+        """
+        Returns (changed, hash, stat). The file is only read when it is new or
+        its size, mtime or inode differ from what was recorded. The stat is
+        taken before hashing and extraction and is what `upsert` records, so
+        a write that lands while the file is being ingested shows up as a
+        change on the next run instead of being taken for the ingested version.
+        """
+        st = file_path.stat()
+        if not stored:
+            return True, self.compute_hash(file_path), st  # new file
+
+        stored_hash, stored_mtime, stored_size, stored_inode = stored
+        current = (st.st_size, st.st_mtime, st.st_ino)
+        if current == (stored_size, stored_mtime, stored_inode):
+            return False, stored_hash, st
 
-        stored_hash, stored_mtime = row
         current_hash = self.compute_hash(file_path)
-        current_mtime = file_path.stat().st_mtime
-        return stored_hash != current_hash or stored_mtime != current_mtime
+        if current_hash != stored_hash:
+            return True, current_hash, st
+
+        # touched or copied in place: same content, just remember the new stat
+        self._update_stat(file_path.stem, st)
+        return False, current_hash, st
 
-    def upsert(self, file_path: Path, chunk_count: int):
+    def upsert(
+        self,
+        file_path: Path,
+        chunk_count: int,
+        file_hash: Optional[str],
+        st: os.stat_result,
+    ):
+        # file_hash and st as returned by check() before the file was ingested
         file_id = file_path.stem
-        file_hash = self.compute_hash(file_path)
-        mtime = file_path.stat().st_mtime
         ext = file_path.suffix.lstrip(".")
         now = time.time()
-        with self._connect() as conn:
+        with self.db.transaction() as conn:
             conn.execute(
                 """
-                INSERT INTO files (file_id, path, ext, hash, modified_at, chunk_count, processed_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO files (file_id, path, ext, hash, modified_at, chunk_count, processed_at, size, inode)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(file_id) DO UPDATE SET
+                    path=excluded.path,
                     hash=excluded.hash,
                     modified_at=excluded.modified_at,
                     chunk_count=excluded.chunk_count,
-                    processed_at=excluded.processed_at
+                    processed_at=excluded.processed_at,
+                    size=excluded.size,
+                    inode=excluded.inode
                 """,
-                (file_id, str(file_path), ext, file_hash, mtime, chunk_count, now),
+                (
+                    file_id,
+                    str(file_path),
+                    ext,
+                    file_hash,
+                    st.st_mtime,
+                    chunk_count,
+                    now,
+                    st.st_size,
+                    st.st_ino,
+                ),
             )
-            conn.commit()
+        self._notify(file_id)
+
+    def _update_stat(self, file_id: str, st):
+        with self.db.transaction() as conn:
+            conn.execute(
+                "UPDATE files SET modified_at=?, size=?, inode=? WHERE file_id=?",
+                (st.st_mtime, st.st_size, st.st_ino, file_id),
+            )
+
+    def delete(self, file_id: str):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM files WHERE file_id=?", (file_id,))
+        self._notify(file_id)
+
+    def known_files(self) -> Dict[str, str]:
+        conn = self.db.connection()
+        rows = conn.execute("SELECT file_id, path FROM files").fetchall()
+        return {file_id: path for file_id, path in rows}
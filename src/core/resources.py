@@ -0,0 +1,171 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ResourceRegistry:
+    """
+    Process-wide shared objects, each built by its factory on first get()
+    and only once, even when several threads ask at the same time. Heavy
+    models can be loaded ahead of the first request with warm_up(), which
+    runs the registered warmers in a background thread.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+        self._warmers: List[Tuple[str, Callable[[], Any]]] = []
+        self._warm_state = "cold"
+        self._warm_error: Optional[str] = None
+        self._warmed: List[str] = []
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.RLock()
+
+    def add_warmer(self, name: str, warm: Callable[[], Any]):
+        self._warmers.append((name, warm))
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource '{name}'")
+        with self._locks[name]:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def warm_up(self) -> threading.Thread:
+        with self._lock:
+            if self._warm_thread is None:
+                self._warm_thread = threading.Thread(
+                    target=self._warm, name="resource-warm-up", daemon=True
+                )
+                self._warm_thread.start()
+            return self._warm_thread
+
+    def _warm(self):
+        self._warm_state = "warming"
+        for name, warm in self._warmers:
+            try:
+                warm()
+                self._warmed.append(name)
+                print(f"Warmed up {name}.")
+            except Exception as e:
+                # whatever failed is loaded (and fails loudly) on first use
+                print(f"Warm-up of {name} failed: {e}")
+                self._warm_error = f"{name}: {e}"
+        self._warm_state = "failed" if self._warm_error else "warm"
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self._warm_state,
+            "warmed": list(self._warmed),
+            "error": self._warm_error,
+        }
+
+
+def _embedder():
+    from core.embeddings import EmbeddingManager
+
+    return EmbeddingManager()
+
+
+def _processor():
+    from core.async_processor import FileProcessor
+
+    return FileProcessor(resources.get("embedder"))
+
+
+def _ingestion_worker():
+    from core.ingestion import IngestionWorker
+
+    return IngestionWorker(resources.get("processor"))
+
+
+def _retriever():
+    from core.retriever import Retriever
+
+    return Retriever(resources.get("embedder"))
+
+
+def _context_builder():
+    from core.context import ContextBuilder
+
+    return ContextBuilder(resources.get("retriever"))
+
+
+def _answer_cache():
+    from core.answer_cache import AnswerCache
+
+    cache = AnswerCache(resources.get("embedder"))
+    resources.get("processor").registry.add_listener(cache.invalidate_file)
+    return cache
+
+
+def _user_manager():
+    from core.user.manager import UserManager
+
+    return UserManager()
+
+
+def _quiz_store():
+    from core.quiz.store import QuizStore
+
+    return QuizStore()
+
+
+def _quiz_engine():
+    from core.quiz.engine import QuizEngine
+    from core.quiz.evaluator import Evaluator
+
+    store = resources.get("quiz_store")
+    evaluator = Evaluator(store, resources.get("embedder"))
+    return QuizEngine(store, evaluator, resources.get("user_manager"))
+
+
+def _quiz_generator():
+    from core.quiz.bank import QuestionBank
+    from core.quiz.generator import QuizGenerator
+
+    generator = QuizGenerator(
+        resources.get("context_builder"),
+        resources.get("quiz_store"),
+        QuestionBank(),
+        resources.get("embedder"),
+    )
+    resources.get("processor").registry.add_listener(generator.on_file_changed)
+    return generator
+
+
+def _warm_tokenizer():
+    from core.chunker import get_tokenizer
+
+    get_tokenizer()
+
+
+resources = ResourceRegistry()
+for _name, _factory in [
+    ("embedder", _embedder),
+    ("processor", _processor),
+    ("ingestion_worker", _ingestion_worker),
+    ("retriever", _retriever),
+    ("context_builder", _context_builder),
+    ("answer_cache", _answer_cache),
+    ("user_manager", _user_manager),
+    ("quiz_store", _quiz_store),
+    ("quiz_engine", _quiz_engine),
+    ("quiz_generator", _quiz_generator),
+]:
+    resources.register(_name, _factory)
+
+resources.add_warmer("embedding model", lambda: resources.get("embedder").warm_up())
+resources.add_warmer(
+    "re-ranker", lambda: resources.get("context_builder").reranker.model
+)
+resources.add_warmer("chunking tokenizer", _warm_tokenizer)
@@ -1,6 +1,7 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from core.embeddings import EmbeddingManager
+from config.constants import RETRIEVAL_MODE, HYBRID_CANDIDATES_FACTOR, RRF_K
 
 
 def normalize_query(query: str) -> str:
@@ -9,22 +10,40 @@ def normalize_query(query: str) -> str:
     return query
 
 
+def _to_doc(chunk_id: str, doc: str, metadata: Dict[str, Any], score: float):
+    metadata = metadata or {}
+    return {
+        "id": chunk_id,
+        "file_id": metadata.get("file_id", "unknown"),
+        "file_ext": metadata.get("file_ext", "unknown"),
+        "hash": metadata.get("hash"),
+        "page": metadata.get("page"),
+        "text": doc,
+        "score": score,
+    }
+
+
 class Retriever:
-    def __init__(self, embedder: EmbeddingManager):
+    def __init__(self, embedder: EmbeddingManager, mode: str = RETRIEVAL_MODE):
         self.embedder = embedder
+        self.mode = mode
 
-    def retrieve(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+    def retrieve(
+        self, query: str, top_k: int, mode: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         query_norm = normalize_query(query)
+        mode = mode or self.mode
+        if mode == "dense" or not query_norm:
+            return self._dense(query_norm, top_k)
+        if mode == "lexical":
+            return self._lexical(query_norm, top_k)
+        return self._hybrid(query_norm, top_k)
+
+    def _dense(self, query_norm: str, top_k: int) -> List[Dict[str, Any]]:
         results = self.embedder.query(query_norm, top_k)
 
         docs = [
-            {
-                "id": chunk_id,
-                "file_id": metadata.get("file_id", "unknown"),
-                "file_ext": metadata.get("file_ext", "unknown"),
-                "text": doc,
-                "score": score,
-            }
+            _to_doc(chunk_id, doc, metadata, score)
             for chunk_id, doc, metadata, score in zip(
                 results["ids"][0],
                 results["documents"][0],
@@ -33,3 +52,43 @@ class Retriever:
             )
         ]
         return docs
+
+    def _lexical(self, query_norm: str, top_k: int) -> List[Dict[str, Any]]:
+        hits = self.embedder.lexical_search(query_norm, top_k)
+        return self._load(dict(hits), [chunk_id for chunk_id, _ in hits])
+
+    def _hybrid(self, query_norm: str, top_k: int) -> List[Dict[str, Any]]:
+        n_candidates = top_k * HYBRID_CANDIDATES_FACTOR
+        dense = self._dense(query_norm, n_candidates)
+        lexical = self.embedder.lexical_search(query_norm, n_candidates)
+
+        # reciprocal-rank fusion: only ranks matter, so cosine distances and
+        # BM25 scores never have to be put on a common scale
+        fused: Dict[str, float] = {}
+        for ranking in ([d["id"] for d in dense], [cid for cid, _ in lexical]):
+            for rank, chunk_id in enumerate(ranking):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+        ranked = sorted(fused, key=fused.__getitem__, reverse=True)[:top_k]
+        known = {d["id"]: d for d in dense}
+        missing = [chunk_id for chunk_id in ranked if chunk_id not in known]
+        if missing:
+            known.update({d["id"]: d for d in self._load(fused, missing)})
+
+        docs = []
+        for chunk_id in ranked:
+            if chunk_id in known:
+                docs.append({**known[chunk_id], "score": fused[chunk_id]})
+        return docs
+
+    def _load(self, scores: Dict[str, float], ids: List[str]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        results = self.embedder.get_chunks(ids)
+        by_id = {
+            chunk_id: _to_doc(chunk_id, doc, metadata, scores[chunk_id])
+            for chunk_id, doc, metadata in zip(
+                results["ids"], results["documents"], results["metadatas"]
+            )
+        }
+        return [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
@@ -0,0 +1,200 @@
+import wave
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+import numpy as np
+from config.constants import (
+    WHISPER_MODEL_SIZE,
+    WHISPER_WORKERS,
+    WHISPER_SEGMENT_SECONDS,
+)
+
+SAMPLE_RATE = 16000  # what Whisper expects
+_CUT_SEARCH_SECONDS = 2.0
+_FRAME = SAMPLE_RATE // 50  # 20 ms
+
+# per-process model, loaded once by the pool initializer (or lazily in-process)
+_model = None
+_model_lock = threading.Lock()
+
+
+def _load_model(model_size: str):
+    global _model
+    with _model_lock:
+        if _model is None:
+            import whisper
+
+            print(f"Loading Whisper '{model_size}' model...")
+            _model = whisper.load_model(model_size)
+        return _model
+
+
+def _transcribe_segment(audio: np.ndarray, model_size: str) -> str:
+    model = _load_model(model_size)
+    result: dict = model.transcribe(audio, fp16=model.device.type == "cuda")
+    return result.get("text", "").strip()
+
+
+def _load_wav(file_path: Path) -> Optional[np.ndarray]:
+    with wave.open(str(file_path), "rb") as wav:
+        width, channels, rate = (
+            wav.getsampwidth(),
+            wav.getnchannels(),
+            wav.getframerate(),
+        )
+        frames = wav.readframes(wav.getnframes())
+    dtypes = {1: np.uint8, 2: np.int16, 4: np.int32}
+    if width not in dtypes:
+        return None
+
+    audio = np.frombuffer(frames, dtype=dtypes[width]).astype(np.float32)
+    if width == 1:
+        audio = (audio - 128.0) / 128.0
+    else:
+        audio /= float(2 ** (8 * width - 1))
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        n_out = int(len(audio) * SAMPLE_RATE / rate)
+        audio = np.interp(
+            np.linspace(0, len(audio), n_out, endpoint=False),
+            np.arange(len(audio)),
+            audio,
+        ).astype(np.float32)
+    return audio
+
+
+def _load_av(file_path: Path) -> Optional[np.ndarray]:
+    try:
+        import av
+    except ImportError:
+        return None
+
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+    pieces: List[np.ndarray] = []
+    with av.open(str(file_path)) as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                pieces.append(out.to_ndarray().reshape(-1))
+    if not pieces:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(pieces).astype(np.float32) / 32768.0
+
+
+def load_audio(file_path: Path) -> np.ndarray:
+    """
+    Decodes to 16 kHz mono float32. WAV is read with the stdlib and PyAV
+    (bundled libav, no ffmpeg binary) is used when installed; only then
+    do we fall back to Whisper's ffmpeg subprocess.
+    """
+    audio = None
+    if file_path.suffix.lower() == ".wav":
+        try:
+            audio = _load_wav(file_path)
+        except wave.Error:
+            audio = None
+    if audio is None:
+        audio = _load_av(file_path)
+    if audio is None:
+        import whisper
+
+        audio = whisper.load_audio(str(file_path))
+    return audio
+
+
+def split_audio(audio: np.ndarray, segment_seconds: float) -> List[np.ndarray]:
+    # cut at the quietest 20 ms frame near each boundary so words aren't split
+    segment = int(segment_seconds * SAMPLE_RATE)
+    search = min(int(_CUT_SEARCH_SECONDS * SAMPLE_RATE), segment // 2)
+    segments, start = [], 0
+    while len(audio) - start > segment:
+        window = audio[start + segment - search : start + segment]
+        n_frames = max(len(window) // _FRAME, 1)
+        frames = window[: n_frames * _FRAME].reshape(n_frames, -1)
+        energy = (frames**2).mean(axis=1)
+        cut = start + segment - search + int(energy.argmin()) * frames.shape[1]
+        segments.append(audio[start:cut])
+        start = cut
+    segments.append(audio[start:])
+    return [s for s in segments if len(s)]
+
+
+class TranscriptionService:
+    """
+    Whisper transcription with the model loaded once: in-process and shared
+    when `workers` is 1, otherwise once per worker of a process pool. Long
+    recordings are split into segments that are transcribed in parallel and
+    yielded in order as they finish.
+    """
+
+    def __init__(
+        self,
+        model_size: str = WHISPER_MODEL_SIZE,
+        workers: int = WHISPER_WORKERS,
+        segment_seconds: float = WHISPER_SEGMENT_SECONDS,
+    ):
+        self.model_size = model_size
+        self.workers = workers
+        self.segment_seconds = segment_seconds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a parent that already holds torch threads can hang
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_load_model,
+                    initargs=(self.model_size,),
+                )
+            return self._pool
+
+    def iter_segments(self, file_path: Path) -> Iterator[str]:
+        segments = split_audio(load_audio(file_path), self.segment_seconds)
+        if self.workers <= 1:
+            for segment in segments:
+                # the shared model's decoding hooks aren't safe to run concurrently
+                with self._lock:
+                    text = _transcribe_segment(segment, self.model_size)
+                if text:
+                    yield text
+            return
+
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_transcribe_segment, segment, self.model_size)
+            for segment in segments
+        ]
+        try:
+            for future in futures:
+                text = future.result()
+                if text:
+                    yield text
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def transcribe(self, file_path: Path) -> str:
+        return " ".join(self.iter_segments(file_path))
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+_service: Optional[TranscriptionService] = None
+_service_lock = threading.Lock()
+
+
+def get_transcription_service() -> TranscriptionService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = TranscriptionService()
+        return _service
@@ -1,42 +1,73 @@
 import uuid
-import sqlite3
 from typing import Dict, List
+from core.db import get_database
 from config.constants import SQL3_PATH
 
+# append-only, see Database.migrate()
+MIGRATIONS = [
+    [
+        # updates used to store topic=None as NULL, which a UNIQUE index
+        # doesn't dedupe; it's written as "Unknown" now, so fold those in too
+        "UPDATE user_topic_stats SET topic='Unknown' WHERE topic IS NULL",
+        # fold the duplicate (user_id, topic) rows left by the old
+        # read-then-write update into the oldest one before making it unique
+        """
+        UPDATE user_topic_stats
+        SET attempts = (
+                SELECT SUM(s.attempts) FROM user_topic_stats s
+                WHERE s.user_id IS user_topic_stats.user_id
+                  AND s.topic IS user_topic_stats.topic
+            ),
+            correct = (
+                SELECT SUM(s.correct) FROM user_topic_stats s
+                WHERE s.user_id IS user_topic_stats.user_id
+                  AND s.topic IS user_topic_stats.topic
+            )
+        WHERE id IN (SELECT MIN(id) FROM user_topic_stats GROUP BY user_id, topic)
+        """,
+        """
+        DELETE FROM user_topic_stats
+        WHERE id NOT IN (SELECT MIN(id) FROM user_topic_stats GROUP BY user_id, topic)
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_user_topic_stats_user_topic
+        ON user_topic_stats(user_id, topic)
+        """,
+    ],
+]
+
 
 class UserManager:
     def __init__(self, db_path: str = SQL3_PATH):
         self.db_path = db_path
+        self.db = get_database(db_path)
         self._init_db()
 
-    def _connect(self):
-        return sqlite3.connect(self.db_path)
-
     def _init_db(self):
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY,
-                    name TEXT UNIQUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
+        conn = self.db.connection()
+        cur = conn.cursor()
+        cur.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                name TEXT UNIQUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
 
-                CREATE TABLE IF NOT EXISTS user_topic_stats (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT,
-                    topic TEXT,
-                    attempts INTEGER DEFAULT 0,
-                    correct INTEGER DEFAULT 0,
-                    FOREIGN KEY(user_id) REFERENCES users(user_id)
-                );
-                """
-            )
-            conn.commit()
+            CREATE TABLE IF NOT EXISTS user_topic_stats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                topic TEXT,
+                attempts INTEGER DEFAULT 0,
+                correct INTEGER DEFAULT 0,
+                FOREIGN KEY(user_id) REFERENCES users(user_id)
+            );
+            """
+        )
+        self.db.migrate("user", MIGRATIONS)
 
     def get_or_create_user(self, name: str) -> str:
-        with self._connect() as conn:
+        with self.db.transaction() as conn:
             cur = conn.cursor()
             cur.execute("SELECT user_id FROM users WHERE name=?", (name,))
             row = cur.fetchone()
@@ -47,93 +78,73 @@ class UserManager:
             cur.execute(
                 "INSERT INTO users (user_id, name) VALUES (?, ?)", (user_id, name)
             )
-            conn.commit()
             return user_id
 
     def update_topic_performance(self, user_id: str, topic: str, correct: bool):
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT attempts, correct FROM user_topic_stats WHERE user_id=? AND topic=?",
-                (user_id, topic),
+        with self.db.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO user_topic_stats (user_id, topic, attempts, correct)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(user_id, topic) DO UPDATE
+                SET attempts = attempts + 1, correct = correct + excluded.correct
+                """,
+                # NULLs never conflict, so an untagged question needs a topic
+                (user_id, topic or "Unknown", int(correct)),
             )
-            row = cur.fetchone()
-
-            if row:
-                attempts, correct_count = row
-                cur.execute(
-                    """
-                    UPDATE user_topic_stats
-                    SET attempts=?, correct=?
-                    WHERE user_id=? AND topic=?
-                    """,
-                    (attempts + 1, correct_count + int(correct), user_id, topic),
-                )
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO user_topic_stats (user_id, topic, attempts, correct)
-                    VALUES (?, ?, 1, ?)
-                    """,
-                    (user_id, topic, int(correct)),
-                )
-            conn.commit()
 
     def get_user_profile(self, user_id: str) -> Dict:
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT name, created_at FROM users WHERE user_id=?", (user_id,)
-            )
-            user = cur.fetchone()
-            if not user:
-                return {}
+        conn = self.db.connection()
+        cur = conn.cursor()
+        cur.execute("SELECT name, created_at FROM users WHERE user_id=?", (user_id,))
+        user = cur.fetchone()
+        if not user:
+            return {}
 
-            cur.execute(
-                "SELECT topic, attempts, correct FROM user_topic_stats WHERE user_id=?",
-                (user_id,),
-            )
-            topics = cur.fetchall()
+        cur.execute(
+            "SELECT topic, attempts, correct FROM user_topic_stats WHERE user_id=?",
+            (user_id,),
+        )
+        topics = cur.fetchall()
 
-            return {
-                "user_id": user_id,
-                "name": user[0],
-                "joined": user[1],
-                "topics": [
-                    {
-                        "topic": t[0],
-                        "attempts": t[1],
-                        "correct": t[2],
-                        "accuracy": round(t[2] / t[1] * 100, 2) if t[1] else 0,
-                    }
-                    for t in topics
-                ],
-            }
+        return {
+            "user_id": user_id,
+            "name": user[0],
+            "joined": user[1],
+            "topics": [
+                {
+                    "topic": t[0],
+                    "attempts": t[1],
+                    "correct": t[2],
+                    "accuracy": round(t[2] / t[1] * 100, 2) if t[1] else 0,
+                }
+                for t in topics
+            ],
+        }
 
     def get_weak_topics(self, user_id: str, threshold: float = 70.0) -> List[str]:
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-            SELECT topic, attempts, correct FROM user_topic_stats WHERE user_id=?
+        conn = self.db.connection()
+        rows = conn.execute(
+            """
+            SELECT topic FROM user_topic_stats
+            WHERE user_id=? AND attempts >= 1 AND correct * 100.0 < ? * attempts
+            ORDER BY correct * 1.0 / attempts
             """,
-                (user_id,),
-            )
-            rows = cur.fetchall()
-            print(f"rows in weak_topics: {rows}")
-            return [r[0] for r in rows if r[1] >= 1 and (r[2] / r[1] * 100) < threshold]
+            (user_id, threshold),
+        ).fetchall()
+        return [r[0] for r in rows]
 
     def get_user_summary(self, user_id: str) -> Dict:
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-            SELECT SUM(attempts), SUM(correct)
-            FROM user_topic_stats
-            WHERE user_id=?
-            """,
-                (user_id,),
-            )
+        conn = self.db.connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+        SELECT SUM(attempts), SUM(correct)
+        FROM user_topic_stats
+        WHERE user_id=?
+        """,
+            (user_id,),
+        )
         total_attempts, total_correct = cur.fetchone()
         if not total_attempts:
             return {"attempts": 0, "correct": 0, "accuracy": 0}
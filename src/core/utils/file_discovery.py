@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import List, Optional
 
+DEFAULT_ALLOWED_EXTS = ["pdf", "txt", "jpg", "png", "mp3", "mp4"]
+
 
 def discover_files(
     upload_dir: Path, allowed_exts: Optional[List[str]] = None
@@ -9,7 +11,7 @@ def discover_files(
     Scan a folder and return a list of valid files.
     """
     if allowed_exts is None:
-        allowed_exts = ["pdf", "txt", "jpg", "png", "mp3", "mp4"]
+        allowed_exts = DEFAULT_ALLOWED_EXTS
     files = [
         f
         for f in upload_dir.iterdir()
@@ -0,0 +1,137 @@
+import os
+import asyncio
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from core.utils.file_discovery import DEFAULT_ALLOWED_EXTS
+from config.constants import WATCH_POLL_INTERVAL, WATCH_DEBOUNCE
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # non-Linux hosts or package not installed
+    INotify = None
+    flags = None
+
+ChangeHandler = Callable[[List[Path], List[Path]], Awaitable[None]]
+Snapshot = Dict[Path, Tuple[int, int]]
+
+
+class UploadWatcher:
+    """
+    Keeps an in-memory picture of the upload dir and hands only created,
+    modified or deleted paths to `on_changes(changed, deleted)`.
+    Uses inotify when available and falls back to stat-only polling.
+    """
+
+    def __init__(
+        self,
+        upload_dir: Path,
+        on_changes: ChangeHandler,
+        known_files: Optional[Dict[str, str]] = None,
+        allowed_exts: Optional[List[str]] = None,
+        poll_interval: float = WATCH_POLL_INTERVAL,
+        debounce: float = WATCH_DEBOUNCE,
+    ):
+        self.upload_dir = Path(upload_dir)
+        self.on_changes = on_changes
+        self.known_files = known_files or {}
+        self.allowed_exts = allowed_exts or DEFAULT_ALLOWED_EXTS
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.snapshot: Snapshot = {}
+        self._changed: Set[Path] = set()
+        self._deleted: Set[Path] = set()
+        self._wakeup = asyncio.Event()
+
+    async def run(self):
+        self.snapshot = await asyncio.to_thread(self._scan)
+        self._changed.update(self.snapshot)
+        present = {p.stem for p in self.snapshot}
+        self._deleted.update(
+            Path(path)
+            for file_id, path in self.known_files.items()
+            if file_id not in present
+        )
+        await self._flush()
+
+        if INotify is not None:
+            try:
+                await self._watch_inotify()
+                return
+            except OSError as e:
+                print(f"inotify unavailable ({e}), falling back to polling.")
+        await self._watch_polling()
+
+    def _is_tracked(self, path: Path) -> bool:
+        return path.suffix.lower().lstrip(".") in self.allowed_exts
+
+    def _scan(self) -> Snapshot:
+        snapshot: Snapshot = {}
+        with os.scandir(self.upload_dir) as it:
+            for entry in it:
+                path = Path(entry.path)
+                if not entry.is_file() or not self._is_tracked(path):
+                    continue
+                st = entry.stat()
+                snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    async def _flush(self):
+        changed = sorted(self._changed - self._deleted)
+        deleted = sorted(self._deleted)
+        self._changed.clear()
+        self._deleted.clear()
+        if not changed and not deleted:
+            return
+        print(f"Upload dir changed: {len(changed)} updated, {len(deleted)} deleted.")
+        await self.on_changes(changed, deleted)
+
+    async def _watch_polling(self):
+        print(f"Watching {self.upload_dir} by polling every {self.poll_interval}s.")
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(self._scan)
+            for path, sig in current.items():
+                if self.snapshot.get(path) != sig:
+                    self._changed.add(path)
+            self._deleted.update(p for p in self.snapshot if p not in current)
+            self.snapshot = current
+            await self._flush()
+
+    async def _watch_inotify(self):
+        assert INotify is not None and flags is not None
+        inotify = INotify()
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+        inotify.add_watch(str(self.upload_dir), mask)
+        loop = asyncio.get_running_loop()
+        loop.add_reader(inotify.fileno(), self._on_inotify, inotify)
+        print(f"Watching {self.upload_dir} with inotify.")
+        try:
+            while True:
+                await self._wakeup.wait()
+                # let bursts (copies, editors saving via temp files) settle first
+                await asyncio.sleep(self.debounce)
+                self._wakeup.clear()
+                await self._flush()
+        finally:
+            loop.remove_reader(inotify.fileno())
+            inotify.close()
+
+    def _on_inotify(self, inotify):
+        assert flags is not None
+        for event in inotify.read(timeout=0):
+            path = self.upload_dir / event.name
+            if not event.name or not self._is_tracked(path):
+                continue
+            if event.mask & (flags.DELETE | flags.MOVED_FROM):
+                self.snapshot.pop(path, None)
+                self._changed.discard(path)
+                self._deleted.add(path)
+            else:
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                self.snapshot[path] = (st.st_size, st.st_mtime_ns)
+                self._deleted.discard(path)
+                self._changed.add(path)
+            self._wakeup.set()
@@ -1,10 +1,73 @@
+import asyncio
+from pathlib import Path
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.routes.router import router as api_router
+from api.routes.dependency import (
+    get_ingestion_worker,
+    get_processor,
+    get_quiz_generator,
+)
+from core.resources import resources
+from core.utils.watcher import UploadWatcher
+from config.constants import UPLOAD_DIR, WATCH_UPLOADS, WARM_UP_ON_STARTUP
 
-app = FastAPI(title="Educational Chat & Quiz API", version="1.0")
+
+def _report_watcher_exit(task: asyncio.Task):
+    # the watcher only ever ends by being cancelled at shutdown
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"Upload watcher crashed, new uploads won't be ingested: {error!r}")
+    else:
+        print("Upload watcher stopped unexpectedly, new uploads won't be ingested.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # started first so it hears about every file the first ingestion job adds
+    quiz_generator = get_quiz_generator()
+    quiz_generator.start()
+    worker = get_ingestion_worker()
+    worker.start()
+    watch_task = None
+    if WATCH_UPLOADS:
+        # the watcher's first pass also catches the index up with the upload dir
+        watcher = UploadWatcher(
+            Path(UPLOAD_DIR),
+            worker.handle_changes,
+            known_files=get_processor().registry.known_files(),
+        )
+        watch_task = asyncio.create_task(watcher.run())
+        watch_task.add_done_callback(_report_watcher_exit)
+    else:
+        worker.submit()
+    if WARM_UP_ON_STARTUP:
+        # models load in the background; requests that need one before it is
+        # ready simply load it themselves (once)
+        resources.warm_up()
+    yield
+    if watch_task:
+        watch_task.cancel()
+        try:
+            await watch_task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            pass  # already reported by _report_watcher_exit
+    await worker.stop()
+    await quiz_generator.stop()
+
+
+app = FastAPI(title="Educational Chat & Quiz API", version="1.0", lifespan=lifespan)
 app.include_router(api_router)
 
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "message": "API is running smoothly"}
+    return {
+        "status": "ok",
+        "message": "API is running smoothly",
+        "models": resources.status(),
+    }
@@ -0,0 +1,105 @@
+"""
+Parity and throughput check for the embedding backends: encodes the same
+texts with the fp32 sentence-transformers model and the ONNX int8 export,
+reports the cosine similarity between the two vectors of every text, how
+often both agree on a text's nearest neighbours, and texts/second.
+
+    python -m tools.bench_embeddings                  # chunks from Chroma
+    python -m tools.bench_embeddings --texts notes.txt --batch-size 64
+"""
+
+import time
+import argparse
+from typing import List
+import numpy as np
+from core.embedding_backends import EmbeddingBackend, create_backend
+from config.constants import CHROMA_DB_SAVINGS, CHROMA_COLLECTION_NAME
+
+SAMPLE_TEXTS = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "Fotosyntéza premieňa svetelnú energiu na chemickú energiu glukózy.",
+    "The derivative of a constant function is zero.",
+    "Newton's second law states that force equals mass times acceleration.",
+    "Mitochondria are the site of cellular respiration.",
+    "Bratislava je hlavné mesto Slovenska.",
+    "A binary search runs in logarithmic time on a sorted array.",
+    "The French Revolution began in 1789.",
+]
+
+
+def load_texts(path: str, limit: int) -> List[str]:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()][:limit]
+    try:
+        import chromadb
+
+        client = chromadb.PersistentClient(path=CHROMA_DB_SAVINGS)
+        collection = client.get_or_create_collection(CHROMA_COLLECTION_NAME)
+        docs = collection.get(include=["documents"], limit=limit)["documents"]
+        if docs:
+            return docs
+    except Exception as e:
+        print(f"Could not read chunks from Chroma ({e}), using built-in samples.")
+    return (SAMPLE_TEXTS * (limit // len(SAMPLE_TEXTS) + 1))[:limit]
+
+
+def throughput(backend: EmbeddingBackend, texts: List[str], batch_size: int):
+    backend.encode(texts[:batch_size])  # warm-up
+    start = time.perf_counter()
+    vectors = [
+        backend.encode(texts[i : i + batch_size])
+        for i in range(0, len(texts), batch_size)
+    ]
+    elapsed = time.perf_counter() - start
+    return np.vstack(vectors), len(texts) / elapsed
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9, None)
+
+
+def neighbour_agreement(a: np.ndarray, b: np.ndarray, k: int) -> float:
+    k = min(k, len(a) - 1)
+    if k <= 0:
+        return 1.0
+    overlaps = []
+    for sims_a, sims_b in zip(a @ a.T, b @ b.T):
+        top_a = set(np.argsort(-sims_a)[1 : k + 1])
+        top_b = set(np.argsort(-sims_b)[1 : k + 1])
+        overlaps.append(len(top_a & top_b) / k)
+    return float(np.mean(overlaps))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument("--texts", default="", help="file with one text per line")
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts, args.limit)
+    print(f"{len(texts)} texts, batch size {args.batch_size}")
+
+    reference, candidate = (
+        create_backend("sentence-transformers"),
+        create_backend("onnx-int8"),
+    )
+    ref_vectors, ref_rate = throughput(reference, texts, args.batch_size)
+    cand_vectors, cand_rate = throughput(candidate, texts, args.batch_size)
+
+    ref_vectors, cand_vectors = normalize(ref_vectors), normalize(cand_vectors)
+    cosines = (ref_vectors * cand_vectors).sum(axis=1)
+    agreement = neighbour_agreement(ref_vectors, cand_vectors, args.top_k)
+
+    print(f"{reference.name:>22}: {ref_rate:8.1f} texts/s")
+    print(
+        f"{candidate.name:>22}: {cand_rate:8.1f} texts/s "
+        f"({cand_rate / ref_rate:.2f}x)"
+    )
+    print(
+        f"cosine(fp32, int8): mean {cosines.mean():.4f}, "
+        f"p5 {np.percentile(cosines, 5):.4f}, min {cosines.min():.4f}"
+    )
+    print(f"top-{args.top_k} neighbour agreement: {agreement:.1%}")
@@ -0,0 +1,108 @@
+"""
+Minimal stand-in for Ollama's /api/generate, for exercising the LLM client
+offline (streaming, timeouts, retries, concurrency limits).
+
+    python -m tools.fake_ollama --port 11435 --token-delay 0.05 --fail-first 1
+    OLLAMA_API_URL=http://localhost:11435/api python cli.py expl
+"""
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = "This is a canned answer from the fake Ollama server."
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    response_text = DEFAULT_RESPONSE
+    token_delay = 0.0
+    fail_first = 0
+    protocol_version = "HTTP/1.1"
+
+    _lock = threading.Lock()
+    _requests = 0
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        with FakeOllamaHandler._lock:
+            FakeOllamaHandler._requests += 1
+            attempt = FakeOllamaHandler._requests
+        if attempt <= self.fail_first:
+            self._send_json(503, {"error": "fake overload"})
+            return
+
+        model = payload.get("model", "fake")
+        tokens = self.response_text.split(" ")
+        tokens = [t + " " for t in tokens[:-1]] + tokens[-1:]
+
+        if not payload.get("stream", True):
+            time.sleep(self.token_delay * len(tokens))
+            self._send_json(
+                200, {"model": model, "response": self.response_text, "done": True}
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(self.token_delay)
+                self._write_chunk({"model": model, "response": token, "done": False})
+            self._write_chunk({"model": model, "response": "", "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            print("client disconnected, generation cancelled")
+
+    def _write_chunk(self, data: dict):
+        body = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(body):X}\r\n".encode() + body + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(
+    port: int = 11435,
+    response_text: str = DEFAULT_RESPONSE,
+    token_delay: float = 0.0,
+    fail_first: int = 0,
+) -> ThreadingHTTPServer:
+    FakeOllamaHandler.response_text = response_text
+    FakeOllamaHandler.token_delay = token_delay
+    FakeOllamaHandler.fail_first = fail_first
+    FakeOllamaHandler._requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/generate server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--response", default=DEFAULT_RESPONSE)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.response, args.token_delay, args.fail_first)
+    print(f"Fake Ollama listening on http://127.0.0.1:{args.port}/api")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()